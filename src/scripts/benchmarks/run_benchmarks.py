@@ -0,0 +1,297 @@
+"""
+    Time and memory-profile every stage of the pipeline on synthetic recordings.
+
+    Recordings of N participants x M sets are generated with benchmarks.synthetic and run
+    through ingestion, resampling, the outlier methods, the low-pass filter, PCA and the
+    temporal and frequency abstraction. The streaming stage replays one set sample by sample
+    through models.predict_model.StreamingPredictor, with a small model trained on the
+    recordings, and checks the p50 and p99 latency per tick against LATENCY_TARGETS_MS.
+    Every stage is timed `repeat` times without tracing, after which one extra run with
+    tracemalloc records the peak memory. The results are written as JSON together with the
+    commit and the dataset size, so runs can be compared.
+
+    python -m src.scripts.benchmarks.run_benchmarks --participants 5 --sets 10
+"""
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from os import makedirs
+from os.path import join
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from ..data.ingestion import df_from_files
+from ..data.preprocessing import align_and_resample
+from ..data.schema import SENSOR_COLUMNS
+from ..features.data_transformation import LowPassFilter, PrincipalComponentAnalysis
+from ..features.FrequencyAbstraction import FourierTransformation
+from ..features.TemporalAbstraction import NumericalAbstraction
+from ..features.registry import FeatureResolver
+from ..models.predict_model import (
+    LATENCY_TARGETS_MS,
+    ExercisePredictor,
+    benchmark_streaming,
+)
+from ..outlier_removal.outliers import mark_outliers
+from .synthetic import generate_recordings
+
+RESULTS_PATH = Path(__file__).resolve().parents[3] / "reports" / "benchmarks"
+
+SAMPLING_FREQUENCY = 1000 / 200
+
+# Feature columns of the model of the streaming stage, one of every kind.
+STREAMING_COLUMNS = [
+    "acc_y",
+    "gyro_x",
+    "pca_1",
+    "acc_sum_temp_mean_ws_5",
+    "gyro_sum_temp_std_ws_5",
+    "acc_y_freq_0.357_Hz_ws_14",
+    "acc_sum_pse",
+]
+
+# Stages whose output the later stages read.
+STATE_STAGES = ("ingestion", "resampling")
+
+
+def measure(func, repeat=3):
+    """Run func repeat times for the timing and once more under tracemalloc.
+
+    Returns:
+        tuple: The result of the last run and a dict with the timings in seconds and the
+        peak traced memory in MB
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, {
+        "seconds_min": min(timings),
+        "seconds_mean": float(np.mean(timings)),
+        "peak_memory_mb": peak / 2**20,
+    }
+
+
+def stages(files):
+    """The benchmarked stages, in pipeline order.
+
+    Every stage is a (name, func) pair where func takes the outputs of the earlier stages and
+    returns a function without arguments that runs the stage on fresh copies.
+    """
+
+    def ingestion(state):
+        return lambda: df_from_files(files)
+
+    def resampling(state):
+        df_gyro, df_acc = state["ingestion"]
+        return lambda: align_and_resample(df_acc, df_gyro)
+
+    def outliers(method):
+        def stage(state):
+            df = state["resampling"]
+            return lambda: mark_outliers(df, SENSOR_COLUMNS, strategy=method)
+
+        return stage
+
+    def low_pass(state):
+        df = state["imputed"]
+
+        def run():
+            data_table = df.copy()
+            for col in SENSOR_COLUMNS:
+                data_table = LowPassFilter().low_pass_filter(
+                    data_table, col, SAMPLING_FREQUENCY, 1.3, order=5
+                )
+            return data_table
+
+        return run
+
+    def pca(state):
+        df = state["imputed"]
+        return lambda: PrincipalComponentAnalysis().apply_pca(
+            df.copy(), SENSOR_COLUMNS, 3
+        )
+
+    def temporal(state):
+        df = state["imputed"]
+        return lambda: NumericalAbstraction().abstract_numerical(
+            df.copy(), SENSOR_COLUMNS, 5, ["mean", "std"]
+        )
+
+    def frequency(state):
+        df = state["imputed"]
+        return lambda: FourierTransformation().abstract_frequency(
+            df.copy(), SENSOR_COLUMNS, 14, SAMPLING_FREQUENCY
+        )
+
+    def streaming(state):
+        df = state["imputed"]
+        pca = PrincipalComponentAnalysis().fit(df, SENSOR_COLUMNS, 3)
+        features = FeatureResolver(pca=pca).resolve(df.copy(), STREAMING_COLUMNS)
+        features = features.dropna(subset=STREAMING_COLUMNS)
+        model = RandomForestClassifier(n_estimators=20, random_state=0).fit(
+            features[STREAMING_COLUMNS].to_numpy(dtype=np.float32),
+            features["excercise"].astype(str),
+        )
+        predictor = ExercisePredictor(
+            {"model": model, "columns": STREAMING_COLUMNS}, pca=pca
+        )
+
+        # The raw samples of the first set.
+        df_gyro, df_acc = state["ingestion"]
+        first = df_acc["ind"].iloc[0]
+        df_acc = df_acc[df_acc["ind"] == first]
+        df_gyro = df_gyro[df_gyro["ind"] == first]
+        return lambda: benchmark_streaming(predictor, df_acc, df_gyro)
+
+    return [
+        ("ingestion", ingestion),
+        ("resampling", resampling),
+        ("outliers_iqr", outliers("iqr")),
+        ("outliers_chauvenet", outliers("chauvenet")),
+        ("outliers_lof", outliers("lof")),
+        ("low_pass_filter", low_pass),
+        ("pca", pca),
+        ("numerical_abstraction", temporal),
+        ("fourier_transformation", frequency),
+        ("streaming", streaming),
+    ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    participants=5, sets=10, duration=30.0, repeat=3, skip=(), data_path=None
+):
+    """Generate the recordings and benchmark every stage.
+
+    Args:
+        participants (int, optional): Defaults to 5.
+        sets (int, optional): Sets per participant. Defaults to 10.
+        duration (float, optional): Seconds per set. Defaults to 30.
+        repeat (int, optional): Timed runs per stage. Defaults to 3.
+        skip (tuple, optional): Names of stages to leave out, e.g. ("outliers_lof",).
+            Skipped STATE_STAGES still run for the later stages, but are not measured.
+        data_path (string, optional): Folder for the recordings, a temporary folder when
+            None.
+
+    Returns:
+        dict: The run metadata and the results per stage
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        files = generate_recordings(
+            data_path or tmp, participants=participants, sets=sets, duration=duration
+        )
+
+        state = {}
+        results = {}
+        for name, stage in stages(files):
+            if name in skip and name not in STATE_STAGES:
+                continue
+            if name in skip:
+                # The later stages read its output, so it still runs, but unmeasured.
+                result, record = stage(state)(), None
+            else:
+                result, record = measure(stage(state), repeat=repeat)
+            if name in STATE_STAGES:
+                state[name] = result
+            if name == "resampling":
+                state["imputed"] = result.copy()
+                state["imputed"][SENSOR_COLUMNS] = result[SENSOR_COLUMNS].interpolate()
+            if record is None:
+                continue
+            if name == "ingestion":
+                record["rows"] = int(sum(len(df.index) for df in result))
+            elif name == "streaming":
+                record["rows"] = result["ticks"]
+                record["latency_ms"] = {"p50": result["p50"], "p99": result["p99"]}
+                record["latency_targets_ms"] = LATENCY_TARGETS_MS
+                record["targets_met"] = result["targets_met"]
+            elif hasattr(result, "index"):
+                record["rows"] = int(len(result.index))
+            record["rows_per_second"] = (
+                record["rows"] / record["seconds_min"] if "rows" in record else None
+            )
+            results[name] = record
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "participants": participants,
+        "sets": sets,
+        "duration": duration,
+        "files": len(files),
+        "repeat": repeat,
+        "stages": results,
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=5)
+    parser.add_argument("--sets", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip", nargs="*", default=[])
+    parser.add_argument("--output", default=RESULTS_PATH)
+    args = parser.parse_args(args)
+
+    report = run_benchmarks(
+        args.participants, args.sets, args.duration, args.repeat, tuple(args.skip)
+    )
+
+    makedirs(args.output, exist_ok=True)
+    file = join(
+        args.output,
+        f"benchmark-{report['commit'] or 'nogit'}-"
+        f"{args.participants}x{args.sets}.json",
+    )
+    with open(file, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, record in report["stages"].items():
+        print(
+            f"{name:<24} {record['seconds_min'] * 1000:10.1f} ms "
+            f"{record['peak_memory_mb']:8.1f} MB"
+        )
+    latency = report["stages"].get("streaming")
+    if latency is not None:
+        print(
+            f"Streaming latency per tick: p50 {latency['latency_ms']['p50']:.2f} ms, "
+            f"p99 {latency['latency_ms']['p99']:.2f} ms, targets "
+            f"{'met' if latency['targets_met'] else 'NOT met'}"
+        )
+    print(f"Results written to {file}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
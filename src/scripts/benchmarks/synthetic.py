@@ -0,0 +1,131 @@
+"""
+    Generate synthetic MetaWear recordings for the benchmarks.
+
+    Every set becomes an accelerometer (12.5 Hz) and a gyroscope (25 Hz) csv file with the
+    same file name and column layout as the files in data/raw, so they can be read with
+    data.ingestion. The signals are gravity plus a sine at the repetition frequency of the
+    exercise and noise, which is enough for the stages to do realistic work.
+"""
+import string
+from datetime import datetime, timedelta
+from os import makedirs
+from os.path import join
+
+import numpy as np
+import pandas as pd
+
+from ..data.ingestion import EPOCH_COLUMN, UNUSED_COLUMNS, sensor_columns
+
+DEVICE = "C42732BE255C"
+FIRMWARE = "1.4.4"
+SENSOR_RATES = {"Accelerometer": 12.5, "Gyroscope": 25.0}
+
+# Repetitions per second of every exercise, rest has no repetitions.
+EXERCISES = {"bench": 0.4, "ohp": 0.35, "squat": 0.35, "dead": 0.4, "row": 0.65, "rest": 0}
+INTENSITIES = ["heavy", "medium"]
+
+
+def participant_name(i):
+    """A, B, ..., Z, AA, AB, ... names without the "-" and "_" used in the file names."""
+    letters = string.ascii_uppercase
+    name = ""
+    i += 1
+    while i:
+        i, rest = divmod(i - 1, len(letters))
+        name = letters[rest] + name
+    return name
+
+
+def file_name(participant, excercise, intensity, start, sensor):
+    stamp = start.strftime("%Y-%m-%dT%H.%M.%S.") + f"{start.microsecond // 1000:03d}"
+    rate = f"{SENSOR_RATES[sensor]:.3f}Hz"
+    return (
+        f"{participant}-{excercise}-{intensity}_MetaWear_{stamp}_{DEVICE}_"
+        f"{sensor}_{rate}_{FIRMWARE}.csv"
+    )
+
+
+def sensor_frame(start, duration, sensor, frequency, rng):
+    """The rows of one sensor file."""
+    rate = SENSOR_RATES[sensor]
+    elapsed = np.arange(int(duration * rate)) / rate
+    epoch = pd.Timestamp(start).value // 1_000_000 + np.round(elapsed * 1000).astype("int64")
+
+    phase = 2 * np.pi * frequency * elapsed
+    if sensor == "Accelerometer":
+        base = np.array([0.0, 1.0, 0.0])
+        amplitude = np.array([0.05, 0.3, 0.1])
+        noise = 0.02
+    else:
+        base = np.zeros(3)
+        amplitude = np.array([40.0, 10.0, 15.0])
+        noise = 3.0
+    values = (
+        base
+        + amplitude * np.sin(phase)[:, None]
+        + rng.normal(0, noise, (len(elapsed), 3))
+    )
+
+    df = pd.DataFrame(
+        {
+            EPOCH_COLUMN: epoch,
+            UNUSED_COLUMNS[0]: pd.to_datetime(epoch, unit="ms").strftime(
+                "%Y-%m-%dT%H:%M:%S.%f"
+            ).str[:-3],
+            UNUSED_COLUMNS[1]: elapsed,
+        }
+    )
+    for j, col in enumerate(sensor_columns(sensor)):
+        df[col] = values[:, j]
+    return df
+
+
+def generate_recordings(
+    path, participants=5, sets=10, duration=30.0, seed=0, start=datetime(2019, 1, 11)
+):
+    """Write N participants x M sets of synthetic recordings.
+
+    Args:
+        path (string): Output folder, created when missing
+        participants (int, optional): Number of participants. Defaults to 5.
+        sets (int, optional): Sets per participant, cycling through the exercises and
+            intensities. Defaults to 10.
+        duration (float, optional): Seconds per set. Defaults to 30.
+        seed (int, optional): Seed of the noise. Defaults to 0.
+        start (datetime, optional): Start of the first set.
+
+    Returns:
+        list: Paths of the written files
+    """
+    makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    exercises = list(EXERCISES)
+
+    files = []
+    time = start
+    for p in range(participants):
+        participant = participant_name(p)
+        for s in range(sets):
+            excercise = exercises[s % len(exercises)]
+            intensity = (
+                "sitting"
+                if excercise == "rest"
+                else INTENSITIES[(s // len(exercises)) % len(INTENSITIES)]
+            )
+            # Both files of a set carry its start time in their name, like the real
+            # files, but the gyroscope samples start a little earlier.
+            for sensor, offset in (("Accelerometer", 0.4), ("Gyroscope", 0.0)):
+                df = sensor_frame(
+                    time + timedelta(seconds=offset),
+                    duration,
+                    sensor,
+                    EXERCISES[excercise],
+                    rng,
+                )
+                file = join(
+                    path, file_name(participant, excercise, intensity, time, sensor)
+                )
+                df.to_csv(file, index=False, float_format="%.3f")
+                files.append(file)
+            time += timedelta(seconds=duration + 60)
+    return files
@@ -0,0 +1,142 @@
+"""
+    Read the raw MetaWear recordings in data/raw into accelerometer and gyroscope frames.
+
+    Every csv file is named like
+    `A-bench-heavy2-rpe8_MetaWear_2019-01-11T16.10.08.270_C42732BE255C_Accelerometer_12.500Hz_1.4.4.csv`
+    where the first part holds the participant, the excercise and the intensity of the set
+    and the third part from the end the sensor. Files are parsed in a thread (or process)
+    pool with explicit dtypes and concatenated once at the end.
+"""
+from os import listdir
+from os.path import basename, isfile, join
+from pathlib import Path
+
+import pandas as pd
+from joblib import Parallel, delayed
+
+from .schema import FLOAT_DTYPE, LABEL_COLUMNS
+
+# Relative to the src folder, so the scripts run from any working directory.
+RAW_DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "raw"
+
+EPOCH_COLUMN = "epoch (ms)"
+UNUSED_COLUMNS = ("time (01:00)", "elapsed (s)")
+SENSOR_UNITS = {"Accelerometer": "g", "Gyroscope": "deg/s"}
+
+
+def list_raw_files(path=RAW_DATA_PATH):
+    """List all (non hidden) csv files in the raw data folder in a stable order.
+
+    Args:
+        path (string, optional): Folder with the raw MetaWear files.
+
+    Returns:
+        list: Full paths of the files
+    """
+    return sorted(
+        join(path, f) for f in listdir(path) if isfile(join(path, f)) and f[0] != "."
+    )
+
+
+def parse_filename(file):
+    """Extract the sensor and the set labels from a MetaWear file name.
+
+    Args:
+        file (string): Path to the file
+
+    Returns:
+        dict: sensor, participant, excercise and intensity
+    """
+    temp = basename(file)[:-4].split("_")
+    sensor = temp[-3]
+    temp = temp[0].split("-")
+    return {
+        "sensor": sensor,
+        "participant": temp[0],
+        "excercise": temp[1],
+        "intensity": temp[2],
+    }
+
+
+def sensor_columns(sensor):
+    """Names of the three axis columns of a sensor, e.g. `x-axis (g)`."""
+    return [f"{axis}-axis ({SENSOR_UNITS[sensor]})" for axis in "xyz"]
+
+
+def read_sensor_file(file, usecols=None, sensor_dtype=FLOAT_DTYPE):
+    """Read a single MetaWear csv file.
+
+    Args:
+        file (string): Path to the file
+        usecols (list, optional): Columns to parse. Defaults to the epoch and the three axes,
+            so `time (01:00)` and `elapsed (s)` are never parsed. Must include the epoch.
+        sensor_dtype (string, optional): dtype of the axis columns. Defaults to FLOAT_DTYPE.
+
+    Returns:
+        pd.DataFrame: The sensor values with the labels of the set added
+    """
+    labels = parse_filename(file)
+    axes = sensor_columns(labels["sensor"])
+    if usecols is None:
+        usecols = [EPOCH_COLUMN] + axes
+
+    dtypes = {EPOCH_COLUMN: "int64"}
+    dtypes.update({col: sensor_dtype for col in axes})
+
+    df = pd.read_csv(
+        file,
+        usecols=usecols,
+        dtype={col: dtype for col, dtype in dtypes.items() if col in usecols},
+    )
+    df["participant"] = labels["participant"]
+    df["excercise"] = labels["excercise"]
+    df["intensity"] = labels["intensity"]
+    return df
+
+
+def _to_sensor_frame(frames):
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    df.index = pd.to_datetime(df[EPOCH_COLUMN], unit="ms")
+    del df[EPOCH_COLUMN]
+    for col in UNUSED_COLUMNS:
+        if col in df.columns:
+            del df[col]
+    for col in LABEL_COLUMNS:
+        df[col] = df[col].astype("category")
+    return df
+
+
+def df_from_files(
+    files, usecols=None, sensor_dtype=FLOAT_DTYPE, n_jobs=-1, prefer="threads"
+):
+    """Read all MetaWear files into a gyroscope and an accelerometer frame.
+
+    Every file gets its own `ind`, counted separately for both sensors in the order of `files`.
+
+    Args:
+        files (list): Paths to the csv files, see list_raw_files
+        usecols (list, optional): Columns to parse, see read_sensor_file
+        sensor_dtype (string, optional): dtype of the axis columns. Defaults to FLOAT_DTYPE.
+        n_jobs (int, optional): Number of parallel readers. Defaults to -1 (all cores).
+        prefer (string, optional): "threads" or "processes". Defaults to "threads".
+
+    Returns:
+        tuple: df_gyro, df_acc indexed by the measurement time
+    """
+    frames = Parallel(n_jobs=n_jobs, prefer=prefer)(
+        delayed(read_sensor_file)(f, usecols, sensor_dtype) for f in files
+    )
+
+    acc_frames = []
+    gyro_frames = []
+    for f, df in zip(files, frames):
+        if parse_filename(f)["sensor"] == "Gyroscope":
+            df["ind"] = len(gyro_frames) + 1
+            gyro_frames.append(df)
+        else:
+            df["ind"] = len(acc_frames) + 1
+            acc_frames.append(df)
+
+    return _to_sensor_frame(gyro_frames), _to_sensor_frame(acc_frames)
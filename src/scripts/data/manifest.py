@@ -0,0 +1,206 @@
+"""
+    Incremental ingestion of the raw MetaWear recordings.
+
+    A manifest (json) keeps track of every raw file that made it into the interim dataset:
+    its size, modification time, content hash and the `ind` of its recording. On a refresh
+    only new or changed recordings are parsed and resampled, their rows replace the old
+    ones in the interim dataset and all other sets keep their `ind`.
+"""
+import hashlib
+import json
+import os
+from os.path import basename, exists
+
+import pandas as pd
+
+from .ingestion import df_from_files, list_raw_files, parse_filename
+from .preprocessing import align_and_resample
+from .schema import apply_schema
+from .storage import INTERIM_DATA_PATH, load_dataset, save_dataset
+
+MANIFEST_PATH = INTERIM_DATA_PATH.parent / "manifest.json"
+
+
+def file_hash(file, chunk_size=1 << 20):
+    """sha256 of the content of a file."""
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def recording_key(file):
+    """Name of the recording a file belongs to, shared by its accelerometer and gyroscope file.
+
+    `A-bench-heavy2-rpe8_MetaWear_2019-01-11T16.10.08.270_C42732BE255C_Accelerometer_12.500Hz_1.4.4.csv`
+    becomes `A-bench-heavy2-rpe8_MetaWear_2019-01-11T16.10.08.270_C42732BE255C_1.4.4`.
+    """
+    parts = basename(file)[:-4].split("_")
+    return "_".join(parts[:-3] + parts[-1:])
+
+
+class Manifest:
+    """The files that are part of the interim dataset, keyed by file name."""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.files = {}
+        if exists(path):
+            with open(path, "r") as f:
+                self.files = json.load(f)["files"]
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump({"files": self.files}, f, indent=2, sort_keys=True)
+
+    def recording_inds(self):
+        """Mapping from recording to its ind."""
+        return {entry["recording"]: entry["ind"] for entry in self.files.values()}
+
+    def next_ind(self):
+        inds = [entry["ind"] for entry in self.files.values()]
+        return max(inds) + 1 if inds else 1
+
+    def is_unchanged(self, file):
+        """Check a file against the manifest. Size and mtime are compared first and the
+        content is only hashed when they differ.
+
+        Returns:
+            tuple: Whether the content is unchanged and the os.stat of the file, the
+            manifest itself is not modified
+        """
+        stat = os.stat(file)
+        entry = self.files.get(basename(file))
+        if entry is None or stat.st_size != entry["size"]:
+            return False, stat
+        if stat.st_mtime == entry["mtime"]:
+            return True, stat
+        return file_hash(file) == entry["sha256"], stat
+
+    def add(self, file, ind):
+        stat = os.stat(file)
+        self.files[basename(file)] = {
+            "path": file,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": file_hash(file),
+            "recording": recording_key(file),
+            "ind": int(ind),
+        }
+
+
+def process_recordings(files, inds, n_jobs=-1):
+    """Read, merge and resample a set of raw files.
+
+    Args:
+        files (list): Accelerometer and gyroscope files of the recordings
+        inds (dict): ind of every recording, see recording_key
+        n_jobs (int, optional): Number of parallel readers. Defaults to -1.
+
+    Returns:
+        pd.DataFrame: The resampled dataset
+    """
+    df_gyro, df_acc = df_from_files(files, n_jobs=n_jobs)
+    for df, sensor in ((df_gyro, "Gyroscope"), (df_acc, "Accelerometer")):
+        sensor_files = [f for f in files if parse_filename(f)["sensor"] == sensor]
+        file_inds = [inds[recording_key(f)] for f in sensor_files]
+        # df_from_files numbers the files of a sensor 1..n in the order of `files`
+        df["ind"] = pd.Series(file_inds, index=range(1, len(file_inds) + 1))[
+            df["ind"].to_numpy()
+        ].to_numpy()
+    return align_and_resample(df_acc, df_gyro)
+
+
+def update_interim(
+    raw_path=None,
+    interim_path=INTERIM_DATA_PATH,
+    manifest_path=MANIFEST_PATH,
+    n_jobs=-1,
+):
+    """Bring the interim dataset up to date with the raw data folder.
+
+    New recordings get the next free ind, changed recordings keep theirs and the rows of
+    removed recordings are dropped. A recording is removed as soon as one of its files is
+    and is only added once both its files are there. Without manifest or interim dataset
+    everything is rebuilt.
+
+    Args:
+        raw_path (string, optional): Folder with the raw files. Defaults to data/raw.
+        interim_path (string, optional): The interim dataset directory (or .pkl file).
+            Defaults to storage.INTERIM_DATA_PATH.
+        manifest_path (string, optional): The manifest json. Defaults to data/interim/manifest.json.
+        n_jobs (int, optional): Number of parallel readers. Defaults to -1.
+
+    Returns:
+        pd.DataFrame: The updated interim dataset
+    """
+    files = list_raw_files(raw_path) if raw_path is not None else list_raw_files()
+    if exists(interim_path) and exists(manifest_path):
+        manifest = Manifest(manifest_path)
+        df = load_dataset(interim_path)
+    else:
+        manifest = Manifest(manifest_path)
+        manifest.files = {}
+        df = None
+
+    present = {basename(f) for f in files}
+    removed_recordings = {
+        entry["recording"]
+        for name, entry in manifest.files.items()
+        if name not in present
+    }
+    removed = [
+        name
+        for name, entry in manifest.files.items()
+        if entry["recording"] in removed_recordings
+    ]
+
+    changed = []
+    for f in files:
+        unchanged, stat = manifest.is_unchanged(f)
+        if not unchanged:
+            changed.append(f)
+        elif basename(f) not in removed:
+            # Same content with a new mtime, so the next check does not hash it again.
+            manifest.files[basename(f)]["mtime"] = stat.st_mtime
+
+    # Both sensor files of a recording are needed to merge it.
+    sensors = {}
+    for f in files:
+        sensors.setdefault(recording_key(f), set()).add(parse_filename(f)["sensor"])
+    recordings = {
+        recording_key(f) for f in changed if len(sensors[recording_key(f)]) == 2
+    }
+
+    if not removed and not recordings:
+        manifest.save()
+        return df
+
+    inds = manifest.recording_inds()
+    stale_inds = {manifest.files[name]["ind"] for name in removed}
+    for name in removed:
+        del manifest.files[name]
+
+    to_process = [f for f in files if recording_key(f) in recordings]
+    next_ind = manifest.next_ind()
+    for recording in sorted(recordings):
+        if recording not in inds:
+            inds[recording] = next_ind
+            next_ind += 1
+        stale_inds.add(inds[recording])
+
+    if df is not None:
+        df = df[~df["ind"].isin(stale_inds)]
+    if to_process:
+        df_new = process_recordings(to_process, inds, n_jobs=n_jobs)
+        if df is None:
+            df = df_new
+        else:
+            df = apply_schema(pd.concat([df, df_new]).sort_index())
+
+    for f in to_process:
+        manifest.add(f, inds[recording_key(f)])
+    save_dataset(df, interim_path)
+    manifest.save()
+    return df
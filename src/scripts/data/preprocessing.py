@@ -0,0 +1,133 @@
+"""
+    Merge the accelerometer and gyroscope data and resample it to a fixed frequency.
+
+    Accelerometer:    12.500HZ
+    Gyroscope:        25.000Hz
+"""
+import numpy as np
+import pandas as pd
+
+from .schema import FLOAT_DTYPE, LABEL_COLUMNS, META_COLUMNS, SENSOR_COLUMNS, apply_schema
+
+SAMPLING_RULE = {
+    "acc_x": "mean",
+    "acc_y": "mean",
+    "acc_z": "mean",
+    "gyro_x": "mean",
+    "gyro_y": "mean",
+    "gyro_z": "mean",
+    "participant": "last",
+    "excercise": "last",
+    "intensity": "last",
+    "ind": "last",
+}
+
+
+def merge_sensors(df_acc, df_gyro):
+    """Outer join the sensor values of the accelerometer with the gyroscope frame.
+
+    Since the sensors are not synced to the millisecond most rows only contain the
+    values of one of them. The labels of the set are taken from the gyroscope frame.
+
+    Args:
+        df_acc (pd.DataFrame): Accelerometer frame, see ingestion.df_from_files
+        df_gyro (pd.DataFrame): Gyroscope frame, see ingestion.df_from_files
+
+    Returns:
+        pd.DataFrame: The merged dataset
+    """
+    df = pd.concat([df_acc.iloc[:, 0:3], df_gyro], axis=1)
+    df.columns = SENSOR_COLUMNS + META_COLUMNS
+    return df
+
+
+def resampling(df, rule="200ms"):
+    """Resample the merged dataset, every day is resampled separately.
+
+    Args:
+        df (pd.DataFrame): The merged dataset, see merge_sensors
+        rule (string, optional): Resampling frequency. Defaults to "200ms".
+
+    Returns:
+        pd.DataFrame: The resampled dataset without incomplete rows
+    """
+    days = [g for n, g in df.groupby(pd.Grouper(freq="D"))]
+    df = pd.concat(
+        [day.resample(rule=rule).apply(SAMPLING_RULE).dropna() for day in days]
+    )
+    df["ind"] = df["ind"].astype("int")
+    return df
+
+
+def _epoch_ms(index):
+    """Milliseconds since epoch of a DatetimeIndex, independent of its resolution."""
+    return index.values.astype("datetime64[ms]").astype("int64")
+
+
+def _bin_sensor(df, step_ms):
+    """Average the first three columns of a sensor frame per time bucket.
+
+    Returns:
+        tuple: The bucket numbers, the mean values per bucket and the row position of the
+        last sample in every bucket.
+    """
+    ms = _epoch_ms(df.index)
+    order = np.argsort(ms, kind="stable")
+    bins = ms[order] // step_ms
+    values = df.iloc[:, 0:3].to_numpy(dtype=float)[order]
+
+    buckets, starts = np.unique(bins, return_index=True)
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(present, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+
+    last = order[np.append(starts[1:], len(bins)) - 1]
+    return buckets, means, last
+
+
+def align_and_resample(df_acc, df_gyro, step_ms=200, float_dtype=FLOAT_DTYPE):
+    """Resample both sensors directly into fixed buckets and join them.
+
+    Gives the same result as resampling(merge_sensors(df_acc, df_gyro)) without building
+    the outer joined frame: every sensor is binned on integer epoch arithmetic, the sensor
+    values are averaged per bucket and only buckets with values of both sensors are kept.
+    Like the "last" rule, a bucket gets the ind of its last gyroscope sample and the other
+    labels are looked up once per ind.
+
+    Args:
+        df_acc (pd.DataFrame): Accelerometer frame, see ingestion.df_from_files
+        df_gyro (pd.DataFrame): Gyroscope frame, see ingestion.df_from_files
+        step_ms (int, optional): Bucket size in milliseconds. Defaults to 200.
+        float_dtype (string, optional): dtype of the sensor columns, see schema.apply_schema.
+            Defaults to FLOAT_DTYPE.
+
+    Returns:
+        pd.DataFrame: The resampled dataset
+    """
+    acc_buckets, acc_means, _ = _bin_sensor(df_acc, step_ms)
+    gyro_buckets, gyro_means, gyro_last = _bin_sensor(df_gyro, step_ms)
+
+    buckets, acc_pos, gyro_pos = np.intersect1d(
+        acc_buckets, gyro_buckets, assume_unique=True, return_indices=True
+    )
+    values = np.hstack([acc_means[acc_pos], gyro_means[gyro_pos]])
+    complete = ~np.isnan(values).any(axis=1)
+    buckets = buckets[complete]
+    values = values[complete]
+    ind = df_gyro["ind"].to_numpy()[gyro_last[gyro_pos][complete]].astype("int")
+
+    labels = df_gyro.groupby("ind", observed=True)[LABEL_COLUMNS].last()
+
+    df = pd.DataFrame(
+        values,
+        index=pd.DatetimeIndex(
+            pd.to_datetime(buckets * step_ms, unit="ms"), name=df_gyro.index.name
+        ),
+        columns=SENSOR_COLUMNS,
+    )
+    for col in LABEL_COLUMNS:
+        df[col] = labels[col].reindex(ind).to_numpy()
+    df["ind"] = ind
+    return apply_schema(df, float_dtype=float_dtype)
@@ -0,0 +1,74 @@
+"""
+    Column names and in-memory dtypes of the datasets.
+
+    The labels of a set are repeated on every 200 ms row, so they are stored as categoricals.
+    Sensor values and derived features are stored as float32 by default and `ind` as a small
+    integer. Every stage calls apply_schema on its output, memory_report shows what a
+    dataset costs.
+"""
+import numpy as np
+import pandas as pd
+
+SENSOR_COLUMNS = ["acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y", "gyro_z"]
+LABEL_COLUMNS = ["participant", "excercise", "intensity"]
+META_COLUMNS = LABEL_COLUMNS + ["ind"]
+
+FLOAT_DTYPE = "float32"
+IND_DTYPE = "int16"
+
+
+def apply_schema(df, float_dtype=FLOAT_DTYPE, ind_dtype=IND_DTYPE):
+    """Convert a dataset to the compact dtypes, in place.
+
+    Args:
+        df (pd.DataFrame): The dataset
+        float_dtype (string, optional): dtype of all float columns, None keeps them as they
+            are. Defaults to FLOAT_DTYPE.
+        ind_dtype (string, optional): dtype of the ind column. Defaults to IND_DTYPE, a wider
+            type is used when the ind values do not fit.
+
+    Returns:
+        pd.DataFrame: The same dataset
+    """
+    for col in LABEL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    if "ind" in df.columns and len(df.index):
+        ind = df["ind"]
+        if ind.notna().all():
+            if ind.max() > np.iinfo(ind_dtype).max:
+                ind_dtype = "int32"
+            df["ind"] = ind.astype(ind_dtype)
+
+    if float_dtype is not None:
+        floats = [
+            col
+            for col in df.columns
+            if pd.api.types.is_float_dtype(df[col].dtype) and df[col].dtype != float_dtype
+        ]
+        if floats:
+            df[floats] = df[floats].astype(float_dtype)
+    return df
+
+
+def memory_report(df):
+    """Memory usage of every column of a dataset.
+
+    Args:
+        df (pd.DataFrame): The dataset
+
+    Returns:
+        pd.DataFrame: dtype, bytes and share of the total per column, plus a total row
+    """
+    usage = df.memory_usage(deep=True)
+    report = pd.DataFrame(
+        {
+            "dtype": [str(df.index.dtype)] + [str(dtype) for dtype in df.dtypes],
+            "bytes": usage.to_numpy(),
+        },
+        index=usage.index,
+    )
+    report["share"] = report["bytes"] / report["bytes"].sum()
+    report.loc["total"] = ["", report["bytes"].sum(), 1.0]
+    return report
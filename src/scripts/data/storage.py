@@ -0,0 +1,154 @@
+"""
+    Columnar storage of the datasets that are handed from one stage to the next.
+
+    Instead of a single pickle per stage every dataset is written as a directory of Parquet
+    (or Feather) files, partitioned by participant and excercise with hive style folder
+    names (`participant=A/excercise=bench/...`). Reads only touch the requested columns and
+    the partitions that match the filters, and the files can be memory-mapped.
+
+    save_dataset and load_dataset are what the stages use: a path ending in .pkl is still
+    read and written as a pickle, any other path as a columnar dataset.
+"""
+import json
+import operator
+import shutil
+from os.path import isdir
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+from .schema import apply_schema
+
+INDEX_COLUMN = "epoch (ms)"
+PARTITION_COLUMNS = ("participant", "excercise")
+
+# Relative to the src folder, so the scripts run from any working directory.
+DATA_PATH = Path(__file__).resolve().parents[2] / "data"
+INTERIM_DATA_PATH = DATA_PATH / "interim" / "01_data_processed"
+PROCESSED_DATA_PATH = DATA_PATH / "processed" / "02_data_outlier_removed"
+
+FORMATS = {"parquet": "parquet", "feather": "ipc"}
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _expression(filters):
+    """Combine a list of (column, operator, value) tuples into one arrow expression."""
+    expression = None
+    for col, op, value in filters:
+        field = ds.field(col)
+        if op == "in":
+            condition = field.isin(list(value))
+        elif op == "not in":
+            condition = ~field.isin(list(value))
+        else:
+            condition = OPERATORS[op](field, value)
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def write_dataset(df, path, partition_cols=PARTITION_COLUMNS, format="parquet"):
+    """Write a dataset as a partitioned columnar dataset, replacing partitions that exist.
+
+    Args:
+        df (pd.DataFrame): The dataset, indexed by the measurement time
+        path (string): Output directory
+        partition_cols (tuple, optional): Columns to partition on.
+            Defaults to participant and excercise.
+        format (string, optional): "parquet" or "feather". Defaults to "parquet".
+    """
+    table = pa.Table.from_pandas(
+        df.rename_axis(INDEX_COLUMN).reset_index(), preserve_index=False
+    )
+    ds.write_dataset(
+        table,
+        str(path),
+        format=FORMATS[format],
+        partitioning=list(partition_cols),
+        partitioning_flavor="hive",
+        existing_data_behavior="delete_matching",
+    )
+
+
+def read_dataset(
+    path, columns=None, filters=None, format="parquet", memory_map=True, sort=True
+):
+    """Read (part of) a dataset written with write_dataset.
+
+    Args:
+        path (string): Dataset directory
+        columns (list, optional): Columns to load, the time index is always loaded.
+            Defaults to all columns.
+        filters (list, optional): (column, operator, value) tuples that all have to hold,
+            e.g. [("participant", "==", "A"), ("excercise", "in", ["bench", "ohp"])].
+            Filters on partition columns skip whole files.
+        format (string, optional): "parquet" or "feather". Defaults to "parquet".
+        memory_map (bool, optional): Memory-map the files. Defaults to True.
+        sort (bool, optional): Sort the rows by the time index. Defaults to True, without
+            partitions False keeps the order the rows were written in.
+
+    Returns:
+        pd.DataFrame: The dataset
+    """
+    dataset = ds.dataset(
+        str(path),
+        format=FORMATS[format],
+        partitioning="hive",
+        filesystem=pafs.LocalFileSystem(use_mmap=memory_map),
+    )
+    if columns is not None:
+        columns = [INDEX_COLUMN] + [col for col in columns if col != INDEX_COLUMN]
+    table = dataset.to_table(
+        columns=columns, filter=_expression(filters) if filters else None
+    )
+    df = table.to_pandas().set_index(INDEX_COLUMN)
+    # The partition columns come back last, restore the order they were written in.
+    order = columns[1:] if columns is not None else _written_columns(dataset)
+    df = df[[col for col in order if col in df.columns]]
+    if sort:
+        df = df.sort_index(kind="stable")
+    return apply_schema(df, float_dtype=None)
+
+
+def _written_columns(dataset):
+    metadata = dataset.schema.metadata or {}
+    if b"pandas" not in metadata:
+        return list(dataset.schema.names)
+    names = [col["name"] for col in json.loads(metadata[b"pandas"])["columns"]]
+    names += [col for col in dataset.schema.names if col not in names]
+    return [col for col in names if col != INDEX_COLUMN]
+
+
+def save_dataset(df, path, **kwargs):
+    """Write the output of a stage, replacing an earlier output at path.
+
+    Args:
+        df (pd.DataFrame): The dataset
+        path (string): A .pkl file or a dataset directory, see write_dataset for the
+            keyword arguments
+    """
+    if str(path).endswith(".pkl"):
+        df.to_pickle(path)
+        return
+    # Partitions of the earlier output that are not in df would be kept otherwise.
+    if isdir(path):
+        shutil.rmtree(path)
+    write_dataset(df, path, **kwargs)
+
+
+def load_dataset(path, **kwargs):
+    """Read the output of a stage from a .pkl file or a dataset directory, see
+    read_dataset for the keyword arguments."""
+    if isdir(path):
+        return read_dataset(path, **kwargs)
+    return pd.read_pickle(path)
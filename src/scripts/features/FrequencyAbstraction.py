@@ -10,6 +10,9 @@
 # Updated by Dave Ebbelaar on 06-01-2023
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ..helper_f.instrumentation import instrumented
 
 
 # This class performs a Fourier transformation on the data to find frequencies that occur
@@ -24,8 +27,58 @@ class FourierTransformation:
         transformation = np.fft.rfft(data, len(data))
         return transformation.real, transformation.imag
 
-    # Get frequencies over a certain window.
-    def abstract_frequency(self, data_table, cols, window_size, sampling_rate):
+    # Compute the frequency features of a single column for all windows at once. Every window
+    # covers the window_size + 1 values up to and including row i, exactly like the per-row
+    # path. The windows are a strided view on the column, so no data is copied before the fft.
+    def batch_frequency_features(self, values, window_size, sampling_rate):
+        freqs = np.round((np.fft.rfftfreq(int(window_size)) * sampling_rate), 3)
+        values = np.asarray(values, dtype=float)
+        n_rows = len(values)
+
+        real_ampl = np.full((n_rows, len(freqs)), np.nan)
+        max_freq = np.full(n_rows, np.nan)
+        freq_weighted = np.full(n_rows, np.nan)
+        pse = np.full(n_rows, np.nan)
+
+        if n_rows <= window_size:
+            return freqs, real_ampl, max_freq, freq_weighted, pse
+
+        windows = sliding_window_view(values, window_size + 1)
+        (
+            real_ampl[window_size:],
+            max_freq[window_size:],
+            freq_weighted[window_size:],
+            pse[window_size:],
+        ) = self.window_frequency_features(windows, freqs)
+
+        return freqs, real_ampl, max_freq, freq_weighted, pse
+
+    # Compute the frequency features of a 2-D array with one window of window_size + 1 values
+    # per row. Returns the real amplitudes per frequency, max_freq, freq_weighted and pse.
+    def window_frequency_features(self, windows, freqs):
+        # We only look at the real part in this implementation.
+        real = np.fft.rfft(windows, windows.shape[1], axis=1).real[:, : len(freqs)]
+
+        # And select the dominant frequency. We only consider the positive frequencies for now.
+        max_freq = freqs[np.argmax(real, axis=1)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            freq_weighted = np.sum(freqs * real, axis=1) / np.sum(real, axis=1)
+            PSD = np.divide(np.square(real), float(real.shape[1]))
+            PSD_pdf = np.divide(PSD, np.sum(PSD, axis=1, keepdims=True))
+            pse = -np.sum(np.log(PSD_pdf) * PSD_pdf, axis=1)
+
+        return real, max_freq, freq_weighted, pse
+
+    # Get frequencies over a certain window. By default all windows of a column are processed
+    # as one batch, set batched to False to fall back to the original row by row computation.
+    @instrumented()
+    def abstract_frequency(
+        self, data_table, cols, window_size, sampling_rate, batched=True
+    ):
+        if batched:
+            return self.abstract_frequency_batched(
+                data_table, cols, window_size, sampling_rate
+            )
 
         # Create new columns for the frequency data.
         freqs = np.round((np.fft.rfftfreq(int(window_size)) * sampling_rate), 3)
@@ -66,4 +119,26 @@ class FourierTransformation:
                 PSD_pdf = np.divide(PSD, np.sum(PSD))
                 data_table.loc[i, col + "_pse"] = -np.sum(np.log(PSD_pdf) * PSD_pdf)
 
-        return data_table
\ No newline at end of file
+        return data_table
+
+    # Batched version of abstract_frequency, every output column is assigned only once.
+    def abstract_frequency_batched(self, data_table, cols, window_size, sampling_rate):
+        for col in cols:
+            (
+                freqs,
+                real_ampl,
+                max_freq,
+                freq_weighted,
+                pse,
+            ) = self.batch_frequency_features(
+                data_table[col].to_numpy(), window_size, sampling_rate
+            )
+            data_table[col + "_max_freq"] = max_freq
+            data_table[col + "_freq_weighted"] = freq_weighted
+            data_table[col + "_pse"] = pse
+            for j in range(0, len(freqs)):
+                data_table[
+                    col + "_freq_" + str(freqs[j]) + "_Hz_ws_" + str(window_size)
+                ] = real_ampl[:, j]
+
+        return data_table
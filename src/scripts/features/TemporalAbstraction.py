@@ -12,6 +12,8 @@
 import numpy as np
 import scipy.stats as stats
 
+from ..helper_f.instrumentation import instrumented
+
 # Class to abstract a history of numerical values we can use as an attribute.
 class NumericalAbstraction:
 
@@ -32,18 +34,91 @@ class NumericalAbstraction:
         else:
             return np.nan
 
+    # Compute the aggregation with the compiled pandas rolling kernels. This returns None
+    # for aggregation functions without a native kernel. Note that np.std computes the
+    # population standard deviation, whereas pandas uses ddof=1 by default.
+    def rolling_aggregate(self, rolling, aggregation_function):
+        if aggregation_function == "mean":
+            return rolling.mean()
+        elif aggregation_function == "max":
+            return rolling.max()
+        elif aggregation_function == "min":
+            return rolling.min()
+        elif aggregation_function == "median":
+            return rolling.median()
+        elif aggregation_function == "std":
+            return rolling.std(ddof=0)
+        else:
+            return None
+
+    # Rolling mean and population std (ddof=0) for every window size, all from one pass of
+    # cumulative sums and sums of squares over the values. Windows with a missing value are
+    # NaN, like the pandas kernels. The values are centered first, so the sums of squares
+    # lose less precision. Returns a dict from window size to (mean, std).
+    def rolling_moments(self, values, window_sizes):
+        values = np.asarray(values, dtype=float)
+        n = len(values)
+        missing = np.isnan(values)
+        center = np.nanmean(values) if not missing.all() else 0.0
+        centered = np.where(missing, 0.0, values - center)
+        s0 = np.concatenate([[0], np.cumsum(missing)])
+        s1 = np.concatenate([[0.0], np.cumsum(centered)])
+        s2 = np.concatenate([[0.0], np.cumsum(centered**2)])
+
+        moments = {}
+        for ws in window_sizes:
+            mean = np.full(n, np.nan)
+            std = np.full(n, np.nan)
+            if n >= ws:
+                complete = (s0[ws:] - s0[:-ws]) == 0
+                window_mean = (s1[ws:] - s1[:-ws]) / ws
+                window_var = (s2[ws:] - s2[:-ws]) / ws - window_mean**2
+                mean[ws - 1 :] = np.where(complete, window_mean + center, np.nan)
+                std[ws - 1 :] = np.where(
+                    complete, np.sqrt(np.maximum(window_var, 0)), np.nan
+                )
+            moments[ws] = (mean, std)
+        return moments
+
     # Abstract numerical columns specified given a window size (i.e. the number of time points from
-    # the past considered) and an aggregation function.
-    def abstract_numerical(self, data_table, cols, window_size, aggregation_function):
+    # the past considered) and an aggregation function. Both the window size and the aggregation
+    # function can also be lists, in which case all combinations are computed per column: the
+    # mean and std of all window sizes share one pass over the data, the other aggregations
+    # use one rolling kernel each.
+    @instrumented()
+    def abstract_numerical(
+        self, data_table, cols, window_size, aggregation_function, fast=True
+    ):
+        window_sizes = (
+            window_size if isinstance(window_size, (list, tuple)) else [window_size]
+        )
+        aggregation_functions = (
+            aggregation_function
+            if isinstance(aggregation_function, (list, tuple))
+            else [aggregation_function]
+        )
 
         # Create new columns for the temporal data, pass over the dataset and compute values
+        shared = {"mean", "std"} & set(aggregation_functions) if fast else set()
         for col in cols:
-            data_table[
-                col + "_temp_" + aggregation_function + "_ws_" + str(window_size)
-            ] = (
-                data_table[col]
-                .rolling(window_size)
-                .apply(self.aggregate_value(aggregation_function))
-            )
-
-        return data_table
\ No newline at end of file
+            values = data_table[col]
+            moments = {}
+            if shared:
+                moments = self.rolling_moments(
+                    values.to_numpy(dtype=float), window_sizes
+                )
+            for ws in window_sizes:
+                rolling = values.rolling(ws)
+                for aggregation in aggregation_functions:
+                    result = None
+                    if aggregation in shared:
+                        result = moments[ws][0 if aggregation == "mean" else 1]
+                    elif fast:
+                        result = self.rolling_aggregate(rolling, aggregation)
+                    if result is None:
+                        result = rolling.apply(
+                            self.aggregate_value(aggregation), raw=True
+                        )
+                    data_table[col + "_temp_" + aggregation + "_ws_" + str(ws)] = result
+
+        return data_table
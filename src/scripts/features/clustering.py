@@ -0,0 +1,187 @@
+"""
+    Cluster feature of the accelerometer data.
+
+    KMeansClustering fits MiniBatchKMeans chunk by chunk, so the full history never has to be
+    in memory at once, and keeps only the centroids. New data is assigned to its nearest
+    centroid without refitting and the id is added as a small integer `cluster` column.
+    sweep_k fits a range of k in parallel and reports the inertia (elbow) and the silhouette
+    score of every k.
+
+    clustering = KMeansClustering(k=5).fit(df, ["acc_x", "acc_y", "acc_z"])
+    clustering.save("../../../models/clustering.joblib")
+    df = KMeansClustering.load("../../../models/clustering.joblib").transform(df)
+"""
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+from ..helper_f.instrumentation import instrumented
+
+CLUSTER_COLUMNS = ["acc_x", "acc_y", "acc_z"]
+
+
+def cluster_dtype(k):
+    """Smallest integer dtype for k cluster ids."""
+    return np.int8 if k <= np.iinfo(np.int8).max else np.int16
+
+
+def nearest_centroid(values, centroids, chunk_size=65536):
+    """Index of the nearest centroid of every row, computed in chunks of rows.
+
+    ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2 and ||x||^2 is the same for all centroids, so only
+    the last two terms are needed.
+    """
+    centroids = np.asarray(centroids, dtype=float)
+    squared = np.sum(centroids**2, axis=1)
+    labels = np.empty(len(values), dtype=cluster_dtype(len(centroids)))
+    for start in range(0, len(values), chunk_size):
+        chunk = np.asarray(values[start : start + chunk_size], dtype=float)
+        labels[start : start + chunk_size] = np.argmin(
+            squared - 2 * chunk @ centroids.T, axis=1
+        )
+    return labels
+
+
+class KMeansClustering:
+    """Mini-batch k-means over a set of columns.
+
+    Args:
+        k (int, optional): Number of clusters. Defaults to 5.
+        batch_size (int, optional): Rows per mini-batch. Defaults to 4096.
+        random_state (int, optional): Defaults to 0.
+    """
+
+    def __init__(self, k=5, batch_size=4096, random_state=0):
+        self.k = k
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.cols = []
+        self.centroids = None
+
+    def _model(self):
+        return MiniBatchKMeans(
+            n_clusters=self.k,
+            batch_size=self.batch_size,
+            random_state=self.random_state,
+            n_init=3,
+        )
+
+    @instrumented()
+    def fit(self, data_table, cols=CLUSTER_COLUMNS, chunk_size=None):
+        """Fit on a dataset, in chunks of chunk_size rows when given."""
+        if chunk_size is None:
+            self.cols = list(cols)
+            values = data_table[self.cols].dropna().to_numpy(dtype=float)
+            self.centroids = self._model().fit(values).cluster_centers_
+            return self
+
+        def chunks():
+            for start in range(0, len(data_table.index), chunk_size):
+                yield data_table.iloc[start : start + chunk_size]
+
+        return self.fit_chunks(chunks, cols)
+
+    def fit_chunks(self, chunks, cols=CLUSTER_COLUMNS):
+        """Fit on data that does not fit in memory.
+
+        Args:
+            chunks (callable): Returns an iterator over DataFrames, for example the
+                partitions of a stored dataset. The centroids follow the most recent
+                chunks, so chunks that mix the sets give better clusters than chunks in
+                time order.
+            cols (list, optional): Columns to cluster on. Defaults to CLUSTER_COLUMNS.
+        """
+        self.cols = list(cols)
+        model = self._model()
+        pending = np.empty((0, len(self.cols)))
+        for chunk in chunks():
+            values = chunk[self.cols].dropna().to_numpy(dtype=float)
+            # partial_fit needs at least k rows, small chunks are carried over.
+            pending = np.concatenate([pending, values])
+            if len(pending) >= self.k:
+                model.partial_fit(pending)
+                pending = pending[:0]
+        if len(pending):
+            if not hasattr(model, "cluster_centers_") and len(pending) < self.k:
+                raise ValueError(f"Need at least {self.k} rows to fit {self.k} clusters")
+            model.partial_fit(pending)
+        self.centroids = model.cluster_centers_
+        return self
+
+    @instrumented()
+    def transform(self, data_table, col="cluster"):
+        """Add the id of the nearest centroid as a compact integer column.
+
+        Rows with missing values are assigned -1.
+        """
+        values = data_table[self.cols].to_numpy(dtype=float)
+        missing = np.isnan(values).any(axis=1)
+        labels = nearest_centroid(np.where(missing[:, None], 0, values), self.centroids)
+        labels[missing] = -1
+        data_table[col] = labels
+        return data_table
+
+    def apply_clustering(self, data_table, cols=CLUSTER_COLUMNS):
+        self.fit(data_table, cols)
+        return self.transform(data_table)
+
+    def save(self, path):
+        joblib.dump({"cols": self.cols, "k": self.k, "centroids": self.centroids}, path)
+
+    @classmethod
+    def load(cls, path):
+        state = joblib.load(path)
+        clustering = cls(k=state["k"])
+        clustering.cols = state["cols"]
+        clustering.centroids = state["centroids"]
+        return clustering
+
+
+def _score_k(values, k, batch_size, sample_size, random_state):
+    model = MiniBatchKMeans(
+        n_clusters=k, batch_size=batch_size, random_state=random_state, n_init=3
+    ).fit(values)
+    labels = nearest_centroid(values, model.cluster_centers_)
+    inertia = float(np.sum((values - model.cluster_centers_[labels]) ** 2))
+    silhouette = silhouette_score(
+        values,
+        labels,
+        sample_size=min(sample_size, len(values)),
+        random_state=random_state,
+    )
+    return {"k": k, "inertia": inertia, "silhouette": float(silhouette)}
+
+
+def sweep_k(
+    data_table,
+    cols=CLUSTER_COLUMNS,
+    ks=range(2, 11),
+    batch_size=4096,
+    sample_size=10000,
+    n_jobs=-1,
+    random_state=0,
+):
+    """Fit every k in parallel to pick the number of clusters.
+
+    Args:
+        data_table (pd.DataFrame): The dataset
+        cols (list, optional): Columns to cluster on. Defaults to CLUSTER_COLUMNS.
+        ks (iterable, optional): Values of k to try. Defaults to 2 to 10.
+        batch_size (int, optional): Rows per mini-batch. Defaults to 4096.
+        sample_size (int, optional): Rows sampled for the silhouette score, which is
+            quadratic in the number of rows. Defaults to 10000.
+        n_jobs (int, optional): Parallel fits. Defaults to -1 (all cores).
+        random_state (int, optional): Defaults to 0.
+
+    Returns:
+        pd.DataFrame: inertia (for the elbow) and silhouette score per k
+    """
+    values = data_table[list(cols)].dropna().to_numpy(dtype=float)
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_score_k)(values, k, batch_size, sample_size, random_state)
+        for k in ks
+    )
+    return pd.DataFrame(results).set_index("k")
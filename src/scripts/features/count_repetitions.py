@@ -0,0 +1,212 @@
+"""
+    Count the repetitions of every set.
+
+    The chosen channel of a set is low-pass filtered with the cutoff of its exercise, every
+    local maximum of the filtered signal is one repetition. All sets are filtered per `ind`
+    and searched for peaks in one pass over the whole dataset.
+
+    StreamingRepCounter does the same on a live stream with a causal filter: a repetition is
+    emitted as soon as the sample after a peak has come in.
+"""
+import numpy as np
+import pandas as pd
+from scipy.signal import sosfilt, sosfilt_zi
+
+from ..helper_f.signal_processing import butterworth_sos
+from .data_transformation import FilterBank
+from .registry import MAGNITUDE_COLUMNS
+
+# Channel and low-pass cutoff (Hz) per exercise, the slower an exercise the lower the cutoff.
+REP_PARAMETERS = {
+    "bench": {"column": "acc_sum", "cutoff": 0.4},
+    "ohp": {"column": "acc_sum", "cutoff": 0.35},
+    "squat": {"column": "acc_sum", "cutoff": 0.35},
+    "dead": {"column": "acc_sum", "cutoff": 0.4},
+    "row": {"column": "gyro_x", "cutoff": 0.65},
+}
+
+# Repetitions per set of the recordings, by intensity.
+EXPECTED_REPETITIONS = {"heavy": 5, "medium": 10}
+
+
+def channel_values(data_table, column):
+    """The values of a channel, magnitudes are computed from the sensor columns."""
+    if column in data_table.columns:
+        return data_table[column].to_numpy(dtype=float)
+    if column in MAGNITUDE_COLUMNS:
+        values = data_table[MAGNITUDE_COLUMNS[column]].to_numpy(dtype=float)
+        return np.sqrt(np.sum(values**2, axis=1))
+    raise KeyError(f"Unknown channel {column}")
+
+
+def local_maxima(values, starts):
+    """Mark the local maxima of a concatenation of segments.
+
+    Args:
+        values (np.ndarray): The segments one after the other
+        starts (np.ndarray): Boolean mask of the first row of every segment
+
+    Returns:
+        np.ndarray: Boolean mask of the peaks, the first and last row of a segment are never
+        a peak
+    """
+    peaks = np.zeros(len(values), dtype=bool)
+    if len(values) < 3:
+        return peaks
+    peaks[1:-1] = (values[1:-1] > values[:-2]) & (values[1:-1] >= values[2:])
+    # A row next to a segment boundary has only one neighbour in its own segment.
+    peaks[starts] = False
+    peaks[np.flatnonzero(starts)[1:] - 1] = False
+    peaks[-1] = False
+    return peaks
+
+
+def mark_repetitions(
+    dataset,
+    parameters=REP_PARAMETERS,
+    sampling_frequency=5,
+    order=10,
+    label="excercise",
+    group_col="ind",
+):
+    """Mark the rows of the dataset where a repetition peaks.
+
+    Args:
+        dataset (pd.DataFrame): Resampled dataset with the sensor columns, label and group_col
+        parameters (dict, optional): Channel and cutoff per exercise. Defaults to
+            REP_PARAMETERS, exercises without parameters (rest) get no repetitions.
+        sampling_frequency (float, optional): Defaults to 5 Hz.
+        order (int, optional): Order of the low-pass filter. Defaults to 10.
+        label (string, optional): Exercise column. Defaults to "excercise".
+        group_col (string, optional): Set column. Defaults to "ind".
+
+    Returns:
+        pd.Series: Boolean peak mask, aligned to the dataset
+    """
+    # Rows ordered by set, so every set is one contiguous segment.
+    sets = dataset[group_col].to_numpy()
+    order_rows = np.argsort(sets, kind="stable")
+    exercises = dataset[label].to_numpy()[order_rows]
+
+    filtered = np.full(len(order_rows), np.nan)
+    bank = FilterBank()
+    for exercise, params in parameters.items():
+        rows = order_rows[exercises == exercise]
+        if not len(rows):
+            continue
+        subset = pd.DataFrame(
+            {
+                "value": channel_values(dataset.iloc[rows], params["column"]),
+                group_col: sets[rows],
+            }
+        )
+        bank.low_pass_filter(
+            subset,
+            ["value"],
+            sampling_frequency,
+            params["cutoff"],
+            order=order,
+            group_col=group_col,
+        )
+        filtered[exercises == exercise] = subset["value_lowpass"].to_numpy()
+
+    sorted_sets = sets[order_rows]
+    starts = np.ones(len(sorted_sets), dtype=bool)
+    starts[1:] = sorted_sets[1:] != sorted_sets[:-1]
+    peaks = local_maxima(filtered, starts) & ~np.isnan(filtered)
+
+    mask = np.zeros(len(order_rows), dtype=bool)
+    mask[order_rows] = peaks
+    return pd.Series(mask, index=dataset.index, name="repetition")
+
+
+def count_repetitions(dataset, label="excercise", group_col="ind", **kwargs):
+    """Count the repetitions of every set, see mark_repetitions for the arguments.
+
+    Returns:
+        pd.DataFrame: Per set the labels of the set and the number of repetitions
+    """
+    peaks = mark_repetitions(dataset, label=label, group_col=group_col, **kwargs)
+    labels = [
+        col for col in ("participant", label, "intensity") if col in dataset.columns
+    ]
+    sets = dataset[[group_col] + labels].drop_duplicates(group_col).set_index(group_col)
+    sets["repetitions"] = (
+        peaks.groupby(dataset[group_col].to_numpy()).sum().reindex(sets.index)
+    ).astype(int)
+    return sets
+
+
+def expected_repetitions(intensity):
+    """Expected repetitions of a set from its intensity label ("heavy1" -> 5)."""
+    for prefix, reps in EXPECTED_REPETITIONS.items():
+        if str(intensity).startswith(prefix):
+            return reps
+    return np.nan
+
+
+def evaluate_repetitions(counts):
+    """Mean absolute error of the counts against the expected repetitions, per exercise."""
+    expected = counts["intensity"].astype(str).map(expected_repetitions)
+    error = (counts["repetitions"] - expected).abs()
+    return error.groupby(counts["excercise"].astype(str)).mean().dropna()
+
+
+class StreamingRepCounter:
+    """Count repetitions on a live stream of 200 ms rows.
+
+    The channel is filtered causally (sosfilt with its state kept between updates), which
+    delays the signal but never needs future rows. A peak is confirmed, and the repetition
+    emitted, as soon as the next filtered value is lower.
+
+    Args:
+        excercise (string): The exercise of the set, see REP_PARAMETERS
+        sampling_frequency (float, optional): Defaults to 5 Hz.
+        order (int, optional): Order of the low-pass filter. Defaults to 10.
+        parameters (dict, optional): Defaults to REP_PARAMETERS.
+    """
+
+    def __init__(
+        self, excercise, sampling_frequency=5, order=10, parameters=REP_PARAMETERS
+    ):
+        params = parameters[excercise]
+        self.column = params["column"]
+        self.sos = butterworth_sos(order, params["cutoff"], sampling_frequency)
+        self.reset()
+
+    def reset(self):
+        """Start a new set."""
+        self.zi = None
+        self.previous = np.array([])
+        self.rows = 0
+        self.repetitions = 0
+
+    def update(self, rows):
+        """Add new rows of the set.
+
+        Args:
+            rows (pd.DataFrame): New rows with the channel or its sensor columns
+
+        Returns:
+            list: Row number (within the set) of every repetition confirmed by these rows
+        """
+        values = channel_values(rows, self.column)
+        if not len(values):
+            return []
+        if self.zi is None:
+            # Start from steady state at the first value, like filtering a constant signal.
+            self.zi = sosfilt_zi(self.sos) * values[0]
+        filtered, self.zi = sosfilt(self.sos, values, zi=self.zi)
+
+        # The last two values of the previous update decide about peaks on the boundary.
+        window = np.concatenate([self.previous, filtered])
+        offset = self.rows - len(self.previous)
+        found = []
+        if len(window) >= 3:
+            peaks = (window[1:-1] > window[:-2]) & (window[1:-1] >= window[2:])
+            found = list(np.flatnonzero(peaks) + 1 + offset)
+
+        self.previous = window[-2:]
+        self.rows += len(values)
+        self.repetitions += len(found)
+        return found
@@ -9,14 +9,19 @@
 
 # Updated by Dave Ebbelaar on 22-12-2022
 
-from sklearn.decomposition import PCA
-from scipy.signal import butter, lfilter, filtfilt
-import copy
+from sklearn.decomposition import PCA, IncrementalPCA
+import joblib
+import numpy as np
 import pandas as pd
 
+from ..data.schema import FLOAT_DTYPE
+from ..helper_f.instrumentation import instrumented
+from ..helper_f.signal_processing import RangeNormalizer, butterworth_sos, filter_signal
+
 # This class removes the high frequency data (that might be considered noise) from the data.
 # We can only apply this when we do not have missing values (i.e. NaN).
 class LowPassFilter:
+    @instrumented()
     def low_pass_filter(
         self,
         data_table,
@@ -27,29 +32,108 @@ class LowPassFilter:
         phase_shift=True,
     ):
         # http://stackoverflow.com/questions/12093594/how-to-implement-band-pass-butterworth-filter-with-scipy-signal-butter
-        # Cutoff frequencies are expressed as the fraction of the Nyquist frequency, which is half the sampling frequency
-        nyq = 0.5 * sampling_frequency
-        cut = cutoff_frequency / nyq
+        # The filter is designed (and cached) in second-order sections, see FilterBank.
+        sos = butterworth_sos(order, cutoff_frequency, sampling_frequency, "low")
+        data_table[col + "_lowpass"] = filter_signal(data_table[col], sos, phase_shift)
+        return data_table
+
+
+# This class filters several columns at once with cached second-order sections, which is
+# numerically stabler than the 'ba' form at higher orders. Next to low-pass it supports
+# high-pass and band-pass filters, and it can filter every set (e.g. ind) separately so the
+# filter does not run across the boundary between two sets.
+class FilterBank:
+
+    suffixes = {"low": "_lowpass", "high": "_highpass", "band": "_bandpass"}
+
+    # Filter a 2-D array along axis 0, see helper_f.signal_processing.filter_signal.
+    def filter_values(self, values, sos, phase_shift=True):
+        return filter_signal(values, sos, phase_shift)
+
+    @instrumented()
+    def filter(
+        self,
+        data_table,
+        cols,
+        sampling_frequency,
+        cutoff_frequency,
+        order=5,
+        btype="low",
+        phase_shift=True,
+        group_col=None,
+        float_dtype=FLOAT_DTYPE,
+    ):
+        if isinstance(cutoff_frequency, list):
+            cutoff_frequency = tuple(cutoff_frequency)
+        sos = butterworth_sos(order, cutoff_frequency, sampling_frequency, btype)
 
-        b, a = butter(order, cut, btype="low", output="ba", analog=False)
-        if phase_shift:
-            data_table[col + "_lowpass"] = filtfilt(b, a, data_table[col])
+        values = data_table[cols].to_numpy(dtype=float)
+        if group_col is None:
+            filtered = self.filter_values(values, sos, phase_shift)
         else:
-            data_table[col + "_lowpass"] = lfilter(b, a, data_table[col])
+            filtered = np.empty_like(values)
+            for rows in data_table.groupby(group_col, sort=False).indices.values():
+                filtered[rows] = self.filter_values(values[rows], sos, phase_shift)
+
+        if float_dtype is not None:
+            filtered = filtered.astype(float_dtype)
+        for j, col in enumerate(cols):
+            data_table[col + self.suffixes[btype]] = filtered[:, j]
         return data_table
 
+    def low_pass_filter(
+        self, data_table, cols, sampling_frequency, cutoff_frequency, **kwargs
+    ):
+        return self.filter(
+            data_table,
+            cols,
+            sampling_frequency,
+            cutoff_frequency,
+            btype="low",
+            **kwargs,
+        )
+
+    def high_pass_filter(
+        self, data_table, cols, sampling_frequency, cutoff_frequency, **kwargs
+    ):
+        return self.filter(
+            data_table,
+            cols,
+            sampling_frequency,
+            cutoff_frequency,
+            btype="high",
+            **kwargs,
+        )
+
+    def band_pass_filter(
+        self, data_table, cols, sampling_frequency, cutoff_frequency, **kwargs
+    ):
+        return self.filter(
+            data_table,
+            cols,
+            sampling_frequency,
+            cutoff_frequency,
+            btype="band",
+            **kwargs,
+        )
+
 
 # Class for Principal Component Analysis. We can only apply this when we do not have missing values (i.e. NaN).
 # For this we have to impute these first, be aware of this.
+# The normalization statistics and the components are kept after fitting, so new data can be
+# projected with transform and the fitted object can be saved and loaded again.
 class PrincipalComponentAnalysis:
 
     pca = []
 
     def __init__(self):
         self.pca = []
+        self.normalizer = None
+        self.cols = []
 
+    # Normalize the columns, only these columns are copied and returned.
     def normalize_dataset(self, data_table, columns):
-        dt_norm = copy.deepcopy(data_table)
+        dt_norm = pd.DataFrame(index=data_table.index)
         for col in columns:
             dt_norm[col] = (data_table[col] - data_table[col].mean()) / (
                 data_table[col].max()
@@ -62,30 +146,91 @@ class PrincipalComponentAnalysis:
     def determine_pc_explained_variance(self, data_table, cols):
 
         # Normalize the data first.
-        dt_norm = self.normalize_dataset(data_table, cols)
+        dt_norm = RangeNormalizer().fit_transform(data_table[cols].to_numpy())
 
         # perform the PCA.
         self.pca = PCA(n_components=len(cols))
-        self.pca.fit(dt_norm[cols])
+        self.pca.fit(dt_norm)
         # And return the explained variances.
         return self.pca.explained_variance_ratio_
 
-    # Apply a PCA given the number of components we have selected.
-    # We add new pca columns.
-    def apply_pca(self, data_table, cols, number_comp):
-
-        # Normalize the data first.
-        dt_norm = self.normalize_dataset(data_table, cols)
-
-        # perform the PCA.
-        self.pca = PCA(n_components=number_comp)
-        self.pca.fit(dt_norm[cols])
-
-        # Transform our old values.
-        new_values = self.pca.transform(dt_norm[cols])
-
-        # And add the new ones:
-        for comp in range(0, number_comp):
+    # Fit the normalization and the PCA and keep both. When a chunk size is given the PCA is
+    # fitted incrementally over chunks of that many rows.
+    @instrumented()
+    def fit(self, data_table, cols, number_comp, chunk_size=None):
+        if chunk_size is None:
+            self.cols = list(cols)
+            self.normalizer = RangeNormalizer().fit(data_table[self.cols].to_numpy())
+            self.pca = PCA(n_components=number_comp)
+            self.pca.fit(self.normalizer.transform(data_table[self.cols].to_numpy()))
+            return self
+
+        def chunks():
+            for start in range(0, len(data_table.index), chunk_size):
+                yield data_table.iloc[start : start + chunk_size]
+
+        return self.fit_chunks(chunks, cols, number_comp)
+
+    # Fit the normalization and an IncrementalPCA on data that does not fit in memory. The
+    # chunks argument is a function that returns a new iterator over DataFrames (for example
+    # the partitions of a stored dataset), it is iterated twice: once for the normalization
+    # statistics and once for the PCA.
+    def fit_chunks(self, chunks, cols, number_comp):
+        self.cols = list(cols)
+        self.normalizer = RangeNormalizer()
+        for chunk in chunks():
+            self.normalizer.partial_fit(chunk[self.cols].to_numpy())
+
+        self.pca = IncrementalPCA(n_components=number_comp)
+        # IncrementalPCA needs at least number_comp rows per batch. Small chunks are carried
+        # over, and every batch is held back until the next one is complete so a short tail
+        # can still be added to the last batch.
+        batch = np.empty((0, len(self.cols)))
+        pending = batch
+        for chunk in chunks():
+            pending = np.concatenate([pending, chunk[self.cols].to_numpy(dtype=float)])
+            if len(pending) >= number_comp:
+                if len(batch):
+                    self.pca.partial_fit(self.normalizer.transform(batch))
+                batch, pending = pending, pending[:0]
+        batch = np.concatenate([batch, pending])
+        if len(batch) < number_comp:
+            raise ValueError(
+                f"Need at least {number_comp} rows to fit {number_comp} components"
+            )
+        self.pca.partial_fit(self.normalizer.transform(batch))
+        return self
+
+    # Project (new) data on the fitted components and add the pca columns as float64, or as
+    # float_dtype when given (e.g. FLOAT_DTYPE to match the stored features).
+    @instrumented()
+    def transform(self, data_table, float_dtype=None):
+        new_values = self.pca.transform(
+            self.normalizer.transform(data_table[self.cols].to_numpy(dtype=float))
+        )
+        if float_dtype is not None:
+            new_values = new_values.astype(float_dtype)
+        for comp in range(0, new_values.shape[1]):
             data_table["pca_" + str(comp + 1)] = new_values[:, comp]
+        return data_table
 
-        return data_table
\ No newline at end of file
+    # Apply a PCA given the number of components we have selected.
+    # We add new pca columns.
+    def apply_pca(self, data_table, cols, number_comp, float_dtype=None):
+        self.fit(data_table, cols, number_comp)
+        return self.transform(data_table, float_dtype=float_dtype)
+
+    # Store the fitted normalization and components.
+    def save(self, path):
+        joblib.dump(
+            {"cols": self.cols, "normalizer": self.normalizer, "pca": self.pca}, path
+        )
+
+    @classmethod
+    def load(cls, path):
+        state = joblib.load(path)
+        pca = cls()
+        pca.cols = state["cols"]
+        pca.normalizer = state["normalizer"]
+        pca.pca = state["pca"]
+        return pca
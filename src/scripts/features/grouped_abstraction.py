@@ -0,0 +1,108 @@
+"""
+    Run the temporal and frequency abstractions per exercise set.
+
+    The feature classes in this package operate on a single continuous series. When they are
+    applied to the concatenated dataset the rolling and fft windows run across the boundary
+    between two sets, so the first rows of a set contain values of the previous one. The
+    driver below splits the dataset by `ind`, computes the features of every set in its own
+    process and writes the results back in the original row order.
+"""
+import numpy as np
+from joblib import Parallel, delayed
+
+from ..data.schema import FLOAT_DTYPE
+from .FrequencyAbstraction import FourierTransformation
+from .TemporalAbstraction import NumericalAbstraction
+
+
+def _abstract_set(
+    subset,
+    temporal_cols,
+    window_sizes,
+    aggregation_functions,
+    frequency_cols,
+    frequency_window_size,
+    sampling_rate,
+):
+    """Compute the temporal and frequency features of a single set.
+
+    Returns:
+        pd.DataFrame: Only the newly created feature columns, with a RangeIndex.
+    """
+    subset = subset.reset_index(drop=True)
+    n_columns = len(subset.columns)
+
+    if temporal_cols:
+        subset = NumericalAbstraction().abstract_numerical(
+            subset, temporal_cols, list(window_sizes), list(aggregation_functions)
+        )
+    if frequency_cols:
+        subset = FourierTransformation().abstract_frequency(
+            subset, frequency_cols, frequency_window_size, sampling_rate
+        )
+    return subset.iloc[:, n_columns:]
+
+
+def abstract_per_set(
+    data_table,
+    temporal_cols=(),
+    window_sizes=(),
+    aggregation_functions=(),
+    frequency_cols=(),
+    frequency_window_size=None,
+    sampling_rate=None,
+    group_col="ind",
+    n_jobs=-1,
+    float_dtype=FLOAT_DTYPE,
+):
+    """Apply NumericalAbstraction and FourierTransformation to every set separately.
+
+    Args:
+        data_table (pd.DataFrame): The dataset, any index is allowed
+        temporal_cols (list): Columns for the temporal abstraction
+        window_sizes (list): Window sizes for the temporal abstraction
+        aggregation_functions (list): Aggregations for the temporal abstraction
+        frequency_cols (list): Columns for the frequency abstraction
+        frequency_window_size (int): Window size for the frequency abstraction
+        sampling_rate (float): Sampling rate of the dataset in Hz
+        group_col (string, optional): Column identifying a set. Defaults to "ind".
+        n_jobs (int, optional): Number of worker processes. Defaults to -1 (all cores).
+        float_dtype (string, optional): dtype of the feature columns. Defaults to FLOAT_DTYPE.
+
+    Returns:
+        pd.DataFrame: The dataset with the feature columns added, rows keep their order.
+
+    Raises:
+        ValueError: When group_col has missing values, those rows belong to no set.
+    """
+    if data_table[group_col].isna().any():
+        raise ValueError(f"{group_col} has missing values, every row needs a set")
+    columns = list(dict.fromkeys(list(temporal_cols) + list(frequency_cols)))
+    positions = data_table.groupby(group_col, sort=False).indices
+    selected = data_table[columns]
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_abstract_set)(
+            selected.iloc[rows],
+            list(temporal_cols),
+            list(window_sizes),
+            list(aggregation_functions),
+            list(frequency_cols),
+            frequency_window_size,
+            sampling_rate,
+        )
+        for rows in positions.values()
+    )
+    if not results:
+        return data_table
+
+    # Stitch the sets back together at their original positions.
+    features = np.full(
+        (len(data_table.index), len(results[0].columns)), np.nan, dtype=float_dtype
+    )
+    for rows, result in zip(positions.values(), results):
+        features[rows] = result.to_numpy(dtype=float)
+
+    for j, col in enumerate(results[0].columns):
+        data_table[col] = features[:, j]
+    return data_table
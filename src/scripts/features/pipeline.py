@@ -0,0 +1,379 @@
+"""
+    Declarative feature pipeline with a content-addressed cache.
+
+    Every stage declares the stages it reads from and its parameters. The output of a stage
+    is stored on disk, as a columnar dataset (see data.storage), under a key that hashes the
+    keys of its inputs, the name, source and version of the stage and its parameters, where
+    the key of the dataset the pipeline starts from is a hash of its content. Changing a
+    parameter therefore only changes the keys (and recomputes the outputs) of that stage and
+    the stages downstream of it. Files a stage writes besides its output, like the fitted
+    PCA, are cached under the same key and put back when the cached output is used.
+
+    pipeline = build_feature_pipeline(window_sizes=[5, 10], cache_dir="../../data/cache")
+    df_features = pipeline.run(df)
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+from os.path import basename, dirname, exists, join
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ..data.schema import FLOAT_DTYPE, SENSOR_COLUMNS, apply_schema
+from ..data.storage import load_dataset, save_dataset
+from .clustering import CLUSTER_COLUMNS, KMeansClustering
+from .data_transformation import FilterBank, PrincipalComponentAnalysis
+from .grouped_abstraction import abstract_per_set
+from .registry import MAGNITUDE_COLUMNS
+
+INPUT = "input"
+
+# The fitted transformations of the feature build, inference applies the same ones.
+MODEL_PATH = Path(__file__).resolve().parents[3] / "models"
+PCA_PATH = MODEL_PATH / "pca.joblib"
+CLUSTERING_PATH = MODEL_PATH / "clustering.joblib"
+
+
+def dataset_key(data_table):
+    """Hash of the content (index, columns, dtypes and values) of a dataset."""
+    digest = hashlib.sha256()
+    digest.update(
+        pd.util.hash_pandas_object(data_table, index=True).to_numpy().tobytes()
+    )
+    digest.update(json.dumps([str(col) for col in data_table.columns]).encode())
+    digest.update(json.dumps([str(dtype) for dtype in data_table.dtypes]).encode())
+    return digest.hexdigest()
+
+
+class Stage:
+    """A step of the pipeline.
+
+    Args:
+        name (string): Unique name of the stage
+        func (callable): func(*input_tables, **params) returning a DataFrame. It receives
+            copies of its inputs, so it is free to modify them.
+        params (dict, optional): Parameters of the stage, they have to be json serializable.
+        inputs (list, optional): Names of the stages (or "input") the stage reads from.
+            Defaults to the previous stage.
+        cache (bool, optional): Store the output on disk. Defaults to True.
+        version (int, optional): Part of the cache key. The source of func is hashed as
+            well, bump the version when code that func calls changes. Defaults to 1.
+        artifacts (list, optional): Files func writes besides its output, e.g. a fitted
+            model. A copy is cached under the key of the stage and restored with the
+            output, so the files always belong to the last run.
+        options (dict, optional): Keyword arguments of func that do not change its output,
+            e.g. n_jobs. They are passed like the params but are not part of the key.
+    """
+
+    def __init__(
+        self,
+        name,
+        func,
+        params=None,
+        inputs=None,
+        cache=True,
+        version=1,
+        artifacts=None,
+        options=None,
+    ):
+        self.name = name
+        self.func = func
+        self.params = params or {}
+        self.inputs = inputs
+        self.cache = cache
+        self.version = version
+        self.artifacts = [str(path) for path in artifacts or []]
+        self.options = options or {}
+
+    def source_hash(self):
+        try:
+            source = inspect.getsource(self.func)
+        except (OSError, TypeError):
+            return None
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    def key(self, input_keys):
+        description = {
+            "name": self.name,
+            "func": f"{self.func.__module__}.{self.func.__qualname__}",
+            "source": self.source_hash(),
+            "version": self.version,
+            "params": self.params,
+            "inputs": input_keys,
+        }
+        return hashlib.sha256(
+            json.dumps(description, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+
+class FeaturePipeline:
+    """Run a list of stages, reusing the cached output of every stage whose key is known.
+
+    Args:
+        stages (list): The stages, in an order where every stage comes after its inputs
+        cache_dir (string, optional): Folder of the cached outputs, None disables caching.
+    """
+
+    def __init__(self, stages, cache_dir=None):
+        self.stages = stages
+        self.cache_dir = cache_dir
+        self.keys = {}
+        self.computed = []
+
+    def _cache_path(self, stage, key):
+        return join(self.cache_dir, f"{stage.name}-{key[:16]}")
+
+    def _artifact_paths(self, stage, key):
+        folder = join(self.cache_dir, "artifacts", f"{stage.name}-{key[:16]}")
+        return [join(folder, basename(artifact)) for artifact in stage.artifacts]
+
+    @staticmethod
+    def _copy(source, target):
+        # Copied next to the target first, so a crash never leaves half a file.
+        os.makedirs(dirname(target), exist_ok=True)
+        shutil.copyfile(source, f"{target}.tmp")
+        os.replace(f"{target}.tmp", target)
+
+    def run(self, data_table, until=None):
+        """Run the pipeline on a dataset.
+
+        Args:
+            data_table (pd.DataFrame): The dataset the pipeline starts from
+            until (string, optional): Name of the last stage to run. Defaults to all stages.
+
+        Returns:
+            pd.DataFrame: The output of the last stage that was run
+        """
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        outputs = {INPUT: data_table}
+        self.keys = {INPUT: dataset_key(data_table)}
+        self.computed = []
+
+        previous = INPUT
+        for stage in self.stages:
+            inputs = stage.inputs if stage.inputs is not None else [previous]
+            key = stage.key([self.keys[name] for name in inputs])
+            self.keys[stage.name] = key
+
+            path = None
+            if stage.cache and self.cache_dir is not None:
+                path = self._cache_path(stage, key)
+                artifacts = self._artifact_paths(stage, key)
+            if path is not None and exists(path) and all(map(exists, artifacts)):
+                outputs[stage.name] = load_dataset(path, sort=False).rename_axis(
+                    outputs[inputs[0]].index.name
+                )
+                # Another run may have overwritten the files in the meantime.
+                for cached, artifact in zip(artifacts, stage.artifacts):
+                    self._copy(cached, artifact)
+            else:
+                outputs[stage.name] = apply_schema(
+                    stage.func(
+                        *[outputs[name].copy() for name in inputs],
+                        **stage.params,
+                        **stage.options,
+                    )
+                )
+                self.computed.append(stage.name)
+                if path is not None:
+                    for artifact, cached in zip(stage.artifacts, artifacts):
+                        self._copy(artifact, cached)
+                    # Written next to the cache first, so a crash never leaves half an
+                    # output under the key.
+                    save_dataset(outputs[stage.name], f"{path}.tmp", partition_cols=())
+                    if exists(path):
+                        shutil.rmtree(path)
+                    os.replace(f"{path}.tmp", path)
+
+            previous = stage.name
+            if stage.name == until:
+                break
+
+        return outputs[previous]
+
+
+# --------------------------------------------------------------
+# Stages of the feature build
+# --------------------------------------------------------------
+
+
+def impute(data_table, cols):
+    """Interpolate missing values, e.g. the removed outliers."""
+    for col in cols:
+        data_table[col] = data_table[col].interpolate()
+    return data_table
+
+
+def low_pass(
+    data_table, cols, sampling_frequency, cutoff_frequency, order=5, group_col=None
+):
+    """Add a low-pass filtered '<col>_lowpass' column for every column."""
+    return FilterBank().low_pass_filter(
+        data_table,
+        list(cols),
+        sampling_frequency,
+        cutoff_frequency,
+        order=order,
+        group_col=group_col,
+    )
+
+
+def principal_components(data_table, cols, number_comp, path=None):
+    """Add the 'pca_<n>' columns and save the fitted PCA to path when given."""
+    pca = PrincipalComponentAnalysis().fit(data_table, list(cols), number_comp)
+    if path is not None:
+        os.makedirs(dirname(path), exist_ok=True)
+        pca.save(path)
+    return pca.transform(data_table, float_dtype=FLOAT_DTYPE)
+
+
+def magnitude(data_table):
+    """Add the magnitude of the accelerometer and the gyroscope vectors."""
+    for col, axes in MAGNITUDE_COLUMNS.items():
+        values = data_table[axes].to_numpy(dtype=float)
+        data_table[col] = np.sqrt(np.sum(values**2, axis=1)).astype(FLOAT_DTYPE)
+    return data_table
+
+
+def temporal(data_table, cols, window_sizes, aggregation_functions, n_jobs=-1):
+    """Temporal abstraction per set, see grouped_abstraction.abstract_per_set."""
+    return abstract_per_set(
+        data_table,
+        temporal_cols=list(cols),
+        window_sizes=list(window_sizes),
+        aggregation_functions=list(aggregation_functions),
+        n_jobs=n_jobs,
+    )
+
+
+def frequency(data_table, cols, window_size, sampling_rate, n_jobs=-1):
+    """Frequency abstraction per set, see grouped_abstraction.abstract_per_set."""
+    return abstract_per_set(
+        data_table,
+        frequency_cols=list(cols),
+        frequency_window_size=window_size,
+        sampling_rate=sampling_rate,
+        n_jobs=n_jobs,
+    )
+
+
+def cluster(data_table, cols, k, chunk_size, path=None):
+    """Add the 'cluster' column of a mini-batch k-means fit on chunks of chunk_size rows
+    and save the fitted clustering to path when given."""
+    clustering = KMeansClustering(k=k).fit(
+        data_table, list(cols), chunk_size=chunk_size
+    )
+    if path is not None:
+        os.makedirs(dirname(path), exist_ok=True)
+        clustering.save(path)
+    return clustering.transform(data_table)
+
+
+def combine(data_table, *others):
+    """Add the columns of the other tables that data_table does not have yet."""
+    for other in others:
+        new = [col for col in other.columns if col not in data_table.columns]
+        data_table = pd.concat([data_table, other[new]], axis=1)
+    return data_table
+
+
+def build_feature_pipeline(
+    predictor_columns=SENSOR_COLUMNS,
+    sampling_frequency=1 / 0.2,
+    cutoff_frequency=1.3,
+    order=5,
+    number_comp=3,
+    pca_path=PCA_PATH,
+    window_sizes=(5,),
+    aggregation_functions=("mean", "std"),
+    frequency_window_size=14,
+    cluster_k=None,
+    cluster_columns=CLUSTER_COLUMNS,
+    cluster_chunk_size=65536,
+    clustering_path=CLUSTERING_PATH,
+    n_jobs=-1,
+    cache_dir=None,
+):
+    """The feature build of build_features as a pipeline.
+
+    imputation -> low-pass -> PCA -> magnitude -> temporal + frequency features. The
+    temporal and the frequency stage both read from the magnitude stage, so changing the
+    window size of one of them does not recompute the other. With cluster_k a cluster
+    stage on cluster_columns reads from the magnitude stage as well.
+
+    The fitted PCA and clustering are saved to pca_path and clustering_path (None to skip),
+    predict_model loads them from there.
+    """
+    predictor_columns = list(predictor_columns)
+    feature_columns = predictor_columns + ["acc_sum", "gyro_sum"]
+    stages = [
+        Stage("impute", impute, {"cols": predictor_columns}),
+        Stage(
+            "low_pass",
+            low_pass,
+            {
+                "cols": predictor_columns,
+                "sampling_frequency": sampling_frequency,
+                "cutoff_frequency": cutoff_frequency,
+                "order": order,
+            },
+        ),
+        Stage(
+            "pca",
+            principal_components,
+            {
+                "cols": predictor_columns,
+                "number_comp": number_comp,
+                "path": None if pca_path is None else str(pca_path),
+            },
+            artifacts=[] if pca_path is None else [pca_path],
+        ),
+        Stage("magnitude", magnitude),
+        Stage(
+            "temporal",
+            temporal,
+            {
+                "cols": feature_columns,
+                "window_sizes": list(window_sizes),
+                "aggregation_functions": list(aggregation_functions),
+            },
+            inputs=["magnitude"],
+            options={"n_jobs": n_jobs},
+        ),
+        Stage(
+            "frequency",
+            frequency,
+            {
+                "cols": feature_columns,
+                "window_size": frequency_window_size,
+                "sampling_rate": sampling_frequency,
+            },
+            inputs=["magnitude"],
+            options={"n_jobs": n_jobs},
+        ),
+    ]
+    features = ["temporal", "frequency"]
+    if cluster_k:
+        stages.append(
+            Stage(
+                "cluster",
+                cluster,
+                {
+                    "cols": list(cluster_columns),
+                    "k": cluster_k,
+                    "chunk_size": cluster_chunk_size,
+                    "path": None if clustering_path is None else str(clustering_path),
+                },
+                inputs=["magnitude"],
+                artifacts=[] if clustering_path is None else [clustering_path],
+            )
+        )
+        features.append("cluster")
+    stages.append(Stage("features", combine, inputs=features))
+    return FeaturePipeline(stages, cache_dir=cache_dir)
@@ -0,0 +1,245 @@
+"""
+    Lazy feature materialization.
+
+    The registry knows how every generated column name is built, for example
+    `acc_x_freq_0.5_Hz_ws_14`, `acc_y_temp_mean_ws_5`, `acc_y_lowpass`, `pca_1` or `acc_sum`.
+    Given the columns a model needs, the resolver computes only those columns and the columns
+    they depend on, instead of the full feature build:
+
+    resolver = FeatureResolver()
+    df = resolver.resolve(df, model_columns)
+
+    The parameters of the resolver are the ones of pipeline.build_feature_pipeline, so the
+    values are the same as in the full build. The pca and cluster columns need the
+    PrincipalComponentAnalysis and KMeansClustering fitted by the feature build.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from ..data.schema import FLOAT_DTYPE, SENSOR_COLUMNS
+from .clustering import CLUSTER_COLUMNS
+from .FrequencyAbstraction import FourierTransformation
+from .TemporalAbstraction import NumericalAbstraction
+from .data_transformation import FilterBank
+
+MAGNITUDE_COLUMNS = {
+    "acc_sum": ["acc_x", "acc_y", "acc_z"],
+    "gyro_sum": ["gyro_x", "gyro_y", "gyro_z"],
+}
+
+# The stages in the order they have to be computed in.
+STAGES = ["lowpass", "magnitude", "pca", "cluster", "temporal", "frequency"]
+
+
+class FeatureRegistry:
+    """Mapping from column name patterns to the kind of feature that generates them."""
+
+    def __init__(self):
+        self.features = []
+
+    def register(self, kind, pattern):
+        """Register a column name pattern, named groups become the parameters of the feature."""
+        self.features.append((kind, re.compile(pattern)))
+
+    def parse(self, column):
+        """Return the kind and the parameters of a generated column, or None."""
+        for kind, pattern in self.features:
+            match = pattern.fullmatch(column)
+            if match:
+                return kind, match.groupdict()
+        return None
+
+
+registry = FeatureRegistry()
+registry.register("temporal", r"(?P<col>.+)_temp_(?P<agg>[a-z]+)_ws_(?P<ws>\d+)")
+registry.register("frequency", r"(?P<col>.+)_freq_(?P<freq>[0-9.]+)_Hz_ws_(?P<ws>\d+)")
+registry.register("frequency", r"(?P<col>.+)_(?P<summary>max_freq|freq_weighted|pse)")
+registry.register("lowpass", r"(?P<col>.+)_lowpass")
+registry.register("pca", r"pca_(?P<comp>\d+)")
+registry.register("magnitude", r"(?P<col>acc_sum|gyro_sum)")
+registry.register("cluster", r"cluster")
+
+
+class FeatureResolver:
+    """Compute only the requested feature columns and their dependencies.
+
+    Args:
+        sampling_frequency (float, optional): Sampling frequency in Hz. Defaults to 5.
+        cutoff_frequency (float, optional): Cutoff of the low-pass filter. Defaults to 1.3.
+        order (int, optional): Order of the low-pass filter. Defaults to 5.
+        frequency_window_size (int, optional): Window size of the max_freq, freq_weighted and
+            pse columns, which do not carry it in their name. Defaults to 14.
+        pca (PrincipalComponentAnalysis, optional): The PCA fitted by the feature build,
+            see pipeline.PCA_PATH. Required for the pca columns.
+        clustering (KMeansClustering, optional): The clustering fitted by the feature
+            build, see pipeline.CLUSTERING_PATH. Required for the cluster column.
+        group_col (string, optional): Temporal and frequency features are computed per
+            value of this column. Defaults to "ind".
+        registry (FeatureRegistry, optional): Defaults to the module registry.
+    """
+
+    def __init__(
+        self,
+        sampling_frequency=1 / 0.2,
+        cutoff_frequency=1.3,
+        order=5,
+        frequency_window_size=14,
+        pca=None,
+        clustering=None,
+        group_col="ind",
+        registry=registry,
+    ):
+        self.sampling_frequency = sampling_frequency
+        self.cutoff_frequency = cutoff_frequency
+        self.order = order
+        self.frequency_window_size = frequency_window_size
+        self.pca = pca
+        self.clustering = clustering
+        self.group_col = group_col
+        self.registry = registry
+
+    def _base_columns(self, kind, params):
+        if kind == "magnitude":
+            return MAGNITUDE_COLUMNS[params["col"]]
+        if kind == "pca":
+            return self.pca.cols if self.pca is not None else SENSOR_COLUMNS
+        if kind == "cluster":
+            if self.clustering is not None:
+                return self.clustering.cols
+            return CLUSTER_COLUMNS
+        return [params["col"]]
+
+    def plan(self, columns, available):
+        """Work out which columns have to be computed.
+
+        Returns:
+            dict: Per stage a dict from column name to its parameters
+        """
+        plan = {stage: {} for stage in STAGES}
+        pending = [col for col in columns if col not in available]
+        while pending:
+            col = pending.pop()
+            if any(col in specs for specs in plan.values()):
+                continue
+            parsed = self.registry.parse(col)
+            if parsed is None:
+                raise KeyError(f"Unknown feature column {col}")
+            kind, params = parsed
+            plan[kind][col] = params
+            pending.extend(
+                base
+                for base in self._base_columns(kind, params)
+                if base not in available
+            )
+        return plan
+
+    def _groups(self, data_table):
+        if self.group_col is None:
+            return [np.arange(len(data_table.index))]
+        return list(data_table.groupby(self.group_col, sort=False).indices.values())
+
+    def _temporal(self, data_table, specs, new):
+        abstraction = NumericalAbstraction()
+        groups = self._groups(data_table)
+        for col, params in specs.items():
+            values = data_table[params["col"]].to_numpy(dtype=float)
+            result = np.full(len(values), np.nan)
+            for rows in groups:
+                rolling = pd.Series(values[rows]).rolling(int(params["ws"]))
+                result[rows] = abstraction.rolling_aggregate(rolling, params["agg"])
+            new[col] = result.astype(FLOAT_DTYPE)
+
+    def _frequency(self, data_table, specs, new):
+        # One batched fft per (column, window size), only the requested outputs are kept.
+        requests = {}
+        for col, params in specs.items():
+            ws = int(params.get("ws") or self.frequency_window_size)
+            requests.setdefault((params["col"], ws), {})[col] = params
+
+        transformation = FourierTransformation()
+        groups = self._groups(data_table)
+        for (base, ws), columns in requests.items():
+            values = data_table[base].to_numpy(dtype=float)
+            freqs = np.round(
+                (np.fft.rfftfreq(int(ws)) * self.sampling_frequency), 3
+            )
+            outputs = {col: np.full(len(values), np.nan) for col in columns}
+            for rows in groups:
+                (
+                    _,
+                    real_ampl,
+                    max_freq,
+                    freq_weighted,
+                    pse,
+                ) = transformation.batch_frequency_features(
+                    values[rows], ws, self.sampling_frequency
+                )
+                summaries = {
+                    "max_freq": max_freq,
+                    "freq_weighted": freq_weighted,
+                    "pse": pse,
+                }
+                for col, params in columns.items():
+                    if params.get("summary"):
+                        outputs[col][rows] = summaries[params["summary"]]
+                    else:
+                        j = [str(freq) for freq in freqs].index(params["freq"])
+                        outputs[col][rows] = real_ampl[:, j]
+            for col, result in outputs.items():
+                new[col] = result.astype(FLOAT_DTYPE)
+
+    def resolve(self, data_table, columns):
+        """Add the requested columns (and the columns they depend on) to the dataset.
+
+        Args:
+            data_table (pd.DataFrame): The dataset with at least the sensor columns
+            columns (list): The feature columns that are needed
+
+        Returns:
+            pd.DataFrame: The dataset with the requested columns added
+        """
+        plan = self.plan(columns, set(data_table.columns))
+
+        if plan["lowpass"]:
+            FilterBank().low_pass_filter(
+                data_table,
+                [params["col"] for params in plan["lowpass"].values()],
+                self.sampling_frequency,
+                self.cutoff_frequency,
+                order=self.order,
+            )
+        for col, params in plan["magnitude"].items():
+            values = data_table[MAGNITUDE_COLUMNS[col]].to_numpy(dtype=float)
+            data_table[col] = np.sqrt(np.sum(values**2, axis=1)).astype(FLOAT_DTYPE)
+        if plan["pca"]:
+            if self.pca is None:
+                # Refitting on the data to predict would give different components.
+                raise ValueError(
+                    "The pca columns need the fitted PrincipalComponentAnalysis of the "
+                    "feature build, see pipeline.PCA_PATH"
+                )
+            projected = self.pca.transform(
+                data_table[self.pca.cols].copy(), float_dtype=FLOAT_DTYPE
+            )
+            for col in plan["pca"]:
+                data_table[col] = projected[col]
+        if plan["cluster"]:
+            if self.clustering is None:
+                raise ValueError(
+                    "The cluster column needs the fitted KMeansClustering of the feature "
+                    "build, see pipeline.CLUSTERING_PATH"
+                )
+            data_table = self.clustering.transform(data_table)
+        # Window features only read the columns above, collect them and add them at once.
+        new = {}
+        if plan["temporal"]:
+            self._temporal(data_table, plan["temporal"], new)
+        if plan["frequency"]:
+            self._frequency(data_table, plan["frequency"], new)
+        if new:
+            data_table = pd.concat(
+                [data_table, pd.DataFrame(new, index=data_table.index)], axis=1
+            )
+        return data_table
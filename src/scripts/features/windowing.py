@@ -0,0 +1,133 @@
+"""
+    Window level feature tables.
+
+    After the rolling and fft features every 200 ms row is nearly identical to its
+    neighbours, because consecutive windows overlap almost completely. Instead of computing
+    the features for every row and dropping most of them afterwards, window_features only
+    computes them for every `stride`-th row of a set. The features of such a row are the
+    same as the per-set features of pipeline.build_feature_pipeline for that row.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ..data.schema import FLOAT_DTYPE
+from .FrequencyAbstraction import FourierTransformation
+
+AGGREGATIONS = {
+    "mean": np.mean,
+    "max": np.max,
+    "min": np.min,
+    "median": np.median,
+    "std": np.std,
+}
+
+
+def window_ends(n_rows, first_end, stride):
+    """Positions of the last row of every window within a set."""
+    return np.arange(first_end, n_rows, stride)
+
+
+def window_features(
+    data_table,
+    temporal_cols=(),
+    window_sizes=(),
+    aggregation_functions=(),
+    frequency_cols=(),
+    frequency_window_size=None,
+    sampling_rate=None,
+    stride=None,
+    group_col="ind",
+    float_dtype=FLOAT_DTYPE,
+):
+    """One feature row per window of every set.
+
+    A window ends every `stride` rows, starting at the first row with enough history for
+    all requested features. The columns of the dataset are taken from the last row of the
+    window and the features are computed on the windows ending there only.
+
+    Args:
+        data_table (pd.DataFrame): The dataset
+        temporal_cols (list): Columns for the temporal abstraction
+        window_sizes (list): Window sizes for the temporal abstraction
+        aggregation_functions (list): 'mean', 'max', 'min', 'median' and/or 'std'
+        frequency_cols (list): Columns for the frequency abstraction
+        frequency_window_size (int): Window size for the frequency abstraction
+        sampling_rate (float): Sampling rate of the dataset in Hz
+        stride (int, optional): Rows between two windows. Defaults to the largest window
+            size, so windows do not overlap.
+        group_col (string, optional): Column identifying a set. Defaults to "ind".
+        float_dtype (string, optional): dtype of the feature columns. Defaults to FLOAT_DTYPE.
+
+    Returns:
+        pd.DataFrame: The window table, with the same column names as the row level features
+    """
+    window_sizes = [int(ws) for ws in window_sizes]
+    # The frequency abstraction uses window_size + 1 values, see FourierTransformation.
+    history = [ws - 1 for ws in window_sizes if temporal_cols]
+    if frequency_cols:
+        history.append(int(frequency_window_size))
+    first_end = max(history) if history else 0
+    if stride is None:
+        stride = first_end + 1
+
+    transformation = FourierTransformation()
+    if frequency_cols:
+        freqs = np.round(
+            (np.fft.rfftfreq(int(frequency_window_size)) * sampling_rate), 3
+        )
+
+    # Convert every column once, the sets are slices of these arrays.
+    values_of = {
+        col: data_table[col].to_numpy(dtype=float)
+        for col in dict.fromkeys(list(temporal_cols) + list(frequency_cols))
+    }
+
+    positions = []
+    features = []
+    for rows in data_table.groupby(group_col, sort=False).indices.values():
+        ends = window_ends(len(rows), first_end, stride)
+        if not len(ends):
+            continue
+        positions.append(rows[ends])
+
+        set_features = {}
+        for col in temporal_cols:
+            values = values_of[col][rows]
+            for ws in window_sizes:
+                windows = sliding_window_view(values, ws)[ends - ws + 1]
+                for aggregation in aggregation_functions:
+                    set_features[col + "_temp_" + aggregation + "_ws_" + str(ws)] = (
+                        AGGREGATIONS[aggregation](windows, axis=1)
+                    )
+
+        for col in frequency_cols:
+            values = values_of[col][rows]
+            windows = sliding_window_view(values, int(frequency_window_size) + 1)[
+                ends - int(frequency_window_size)
+            ]
+            (
+                real_ampl,
+                max_freq,
+                freq_weighted,
+                pse,
+            ) = transformation.window_frequency_features(windows, freqs)
+            set_features[col + "_max_freq"] = max_freq
+            set_features[col + "_freq_weighted"] = freq_weighted
+            set_features[col + "_pse"] = pse
+            for j in range(0, len(freqs)):
+                set_features[
+                    col + "_freq_" + str(freqs[j]) + "_Hz_ws_" + str(frequency_window_size)
+                ] = real_ampl[:, j]
+
+        features.append(set_features)
+
+    if not positions:
+        return data_table.iloc[:0].copy()
+
+    positions = np.concatenate(positions)
+    window_table = data_table.iloc[positions].copy()
+    for col in features[0]:
+        window_table[col] = np.concatenate(
+            [set_features[col] for set_features in features]
+        ).astype(float_dtype)
+    return window_table
@@ -0,0 +1,221 @@
+"""
+    Per call profiling of the pipeline stages.
+
+    Functions decorated with `instrumented` report, for every call, the wall time, the rows of
+    the input dataset, rows per second, the growth of the peak resident memory (RSS) and the
+    number of output columns. Instrumentation is off by default, a disabled call costs one
+    flag check. Switch it on with enable() or by setting FITNESS_TRACKER_INSTRUMENT=1. Records
+    are kept per process, calls inside joblib worker processes are not collected. Only the
+    records of the last MAX_RECORDS calls are kept, the totals per stage cover all calls, so
+    a long running process does not grow.
+
+    Times are inclusive: when an instrumented stage calls another one, the time of the inner
+    call counts for both stages. Every record names the stage it was called from in "parent"
+    (None at the top level), so the time of the inner stages can be subtracted.
+
+    The records can be written as JSON lines (structured log) or as a Prometheus text file
+    with totals per stage:
+
+        from src.scripts.helper_f import instrumentation
+        instrumentation.enable()
+        ...  # run the pipeline
+        instrumentation.export_prometheus("stages.prom")
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENV_VARIABLE = "FITNESS_TRACKER_INSTRUMENT"
+MAX_RECORDS = 10000
+
+logger = logging.getLogger(__name__)
+
+_enabled = os.environ.get(ENV_VARIABLE, "").lower() in ("1", "true", "yes")
+records = deque(maxlen=MAX_RECORDS)
+# stage -> running totals of all its calls
+totals = {}
+# The stages that are running in this thread, innermost last.
+_active = threading.local()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget all records and totals."""
+    records.clear()
+    totals.clear()
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return 0
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if os.uname().sysname == "Darwin" else peak
+
+
+def _rows(args, kwargs):
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return len(value.index)
+    return None
+
+
+def _columns(result):
+    if isinstance(result, tuple):
+        result = next((r for r in result if isinstance(r, pd.DataFrame)), None)
+    if isinstance(result, pd.DataFrame):
+        return len(result.columns)
+    if isinstance(result, pd.Series):
+        return 1
+    return None
+
+
+def _add_to_totals(record):
+    stage = totals.setdefault(
+        record["stage"],
+        {
+            "calls": 0,
+            "seconds": 0.0,
+            "rows": 0,
+            "peak_rss_delta_mb": record["peak_rss_delta_mb"],
+        },
+    )
+    stage["calls"] += 1
+    stage["seconds"] += record["seconds"]
+    stage["rows"] += record["rows"] or 0
+    stage["peak_rss_delta_mb"] = max(
+        stage["peak_rss_delta_mb"], record["peak_rss_delta_mb"]
+    )
+    stage["output_columns"] = record["output_columns"]
+
+
+def instrumented(name=None):
+    """Decorator that records every call of a function while instrumentation is enabled.
+
+    Args:
+        name (string, optional): Stage name of the records. Defaults to the qualified name of
+            the function, e.g. "LowPassFilter.low_pass_filter".
+    """
+
+    def decorator(func):
+        stage = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            if not hasattr(_active, "stages"):
+                _active.stages = []
+            stack = _active.stages
+            parent = stack[-1] if stack else None
+            stack.append(stage)
+            rss = _peak_rss_kb()
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                stack.pop()
+            seconds = time.perf_counter() - start
+
+            rows = _rows(args, kwargs)
+            record = {
+                "stage": stage,
+                "parent": parent,
+                "timestamp": time.time(),
+                "seconds": seconds,
+                "rows": rows,
+                "rows_per_second": rows / seconds if rows and seconds > 0 else None,
+                "peak_rss_delta_mb": (_peak_rss_kb() - rss) / 1024,
+                "output_columns": _columns(result),
+            }
+            records.append(record)
+            _add_to_totals(record)
+            logger.debug(json.dumps(record))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def summary():
+    """Totals per stage: calls, seconds, rows, rows per second and the largest RSS growth.
+
+    Returns:
+        pd.DataFrame: One row per stage, slowest first
+    """
+    if not totals:
+        return pd.DataFrame(
+            columns=[
+                "calls",
+                "seconds",
+                "rows",
+                "peak_rss_delta_mb",
+                "output_columns",
+                "rows_per_second",
+            ]
+        )
+    df = pd.DataFrame.from_dict(totals, orient="index")
+    df.index.name = "stage"
+    df["rows_per_second"] = df["rows"] / df["seconds"]
+    return df.sort_values("seconds", ascending=False)
+
+
+def export_jsonl(path):
+    """Append the kept records (the last MAX_RECORDS calls) to a JSON lines file."""
+    with open(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def export_prometheus(path, prefix="fitness_tracker_stage"):
+    """Write the totals per stage in the Prometheus text format (e.g. for node_exporter's
+    textfile collector)."""
+    metrics = [
+        ("calls", "counter", "Number of calls"),
+        ("seconds", "counter", "Total wall time in seconds"),
+        ("rows", "counter", "Total rows processed"),
+        ("rows_per_second", "gauge", "Rows processed per second"),
+        ("peak_rss_delta_mb", "gauge", "Largest growth of the peak RSS in MB"),
+        ("output_columns", "gauge", "Output columns of the last call"),
+    ]
+    per_stage = summary()
+    lines = []
+    for metric, kind, description in metrics:
+        full_name = f"{prefix}_{metric}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {full_name} {description}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for stage, value in per_stage[metric].items():
+            if pd.notna(value):
+                lines.append(f'{full_name}{{stage="{stage}"}} {float(value):g}')
+
+    # Write to a temporary file first, so a scraper never reads half a file.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
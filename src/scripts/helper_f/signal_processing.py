@@ -26,80 +26,170 @@
     In summary, a Butterworth filter is a tool that helps clean up signals, like music, by letting through the parts you want and blocking the parts you don't want. 
     It's chosen based on its ability to do this task smoothly and without causing distortion in the signal.
 
+    The filter, the normalization and the PCA below are sklearn transformers that work on plain
+    NumPy arrays (rows are samples, columns are channels). They are fitted once and can be chained
+    with sklearn.pipeline, so the exact same preprocessing is reused at inference time:
+
+        pipeline = signal_pipeline(cutoff_frequency=1.3, sampling_frequency=5, n_components=3)
+        components = pipeline.fit_transform(X)
 """
-from scipy.signal import butter, filtfilt
+
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfiltfilt
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.decomposition import PCA
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
-class low_pass_filter:
-    
-    def __init__(self,
-                signal,
-                order,
-                fs,
-                cutoff_freq,
-                time,
-                filter_type='low',
-                analog=False,
-                output='ba'):
-        
-        self.signal = signal
-        self.Nf = fs * 0.5
-        self.Wn = cutoff_freq/ self.Nf
-        self.filter_type = filter_type
-        self.ouput = output
-        
-        
-    def fit(self):
+
+@lru_cache(maxsize=None)
+def butterworth_sos(order, cutoff_frequency, sampling_frequency, btype="low"):
+    """
+    Design a Butterworth filter in second-order sections form, cached per parameters.
+
+    The cutoff frequencies are expressed as the fraction of the Nyquist frequency, which is half
+    the sampling frequency. For a band-pass filter cutoff_frequency is a (low, high) tuple.
+    """
+    nyq = 0.5 * sampling_frequency
+    cut = np.asarray(cutoff_frequency, dtype=float) / nyq
+    return butter(order, cut, btype=btype, output="sos", analog=False)
+
+
+def filter_signal(values, sos, phase_shift=True):
+    """
+    Filter a 1-D or 2-D array along axis 0.
+
+    With phase_shift the filter runs forwards and backwards (sosfiltfilt), so the filtered signal
+    is not delayed. Signals that are shorter than the default padding are padded with as many
+    values as they have.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return values.copy()
+    if not phase_shift:
+        return sosfilt(sos, values, axis=0)
+    padlen = 3 * (
+        2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    )
+    return sosfiltfilt(sos, values, axis=0, padlen=min(padlen, len(values) - 1))
+
+
+class ButterworthFilter(BaseEstimator, TransformerMixin):
+    """
+    Butterworth filter as a transformer, every column is filtered independently.
+
+    order: The order of the filter.
+
+    cutoff_frequency: The cutoff frequency in Hz, a (low, high) tuple for btype 'band'.
+
+    sampling_frequency: The sampling frequency of the signal in Hz.
+
+    btype: Filter type. It could be 'low' for low-pass, 'high' for high-pass or 'band' for band-pass.
+
+    phase_shift: Filter forwards and backwards so the output is not delayed.
+    """
+
+    def __init__(
+        self,
+        order=5,
+        cutoff_frequency=1.3,
+        sampling_frequency=5.0,
+        btype="low",
+        phase_shift=True,
+    ):
+        self.order = order
+        self.cutoff_frequency = cutoff_frequency
+        self.sampling_frequency = sampling_frequency
+        self.btype = btype
+        self.phase_shift = phase_shift
+
+    def fit(self, X, y=None):
         """
-        Here, scipy.signal.butter function (Butterworth filter) is used to generate a filter.
-
-        N: The order of the filter.
-        
-        Wn: The cutoff frequency or frequencies. 
-        For a low-pass/high-pass filter, Wn is the normalized cutoff frequency. 
-        Its value should be between 0 and 1, where 1 corresponds to half the sampling frequency (Nyquist frequency).
-        For a band-pass or band-stop filter, Wn is a tuple (Wn1, Wn2) representing the lower and upper normalized cutoff frequencies.
-        In simple terms, Wn sets the frequency at which the filter starts to have an effect, and its exact interpretation depends on the type of filter you are designing.
-
-        btype: Filter type. It could be 'low' for low-pass, 'high' for high-pass, 'band' for band-pass, or 'stop' for band-stop.
-        
-        analog: If True, the filter is designed for analog (continuous-time) signal processing. If False (default), it's for digital signal processing.
-        
-        output: Type of output. 'ba' (default) returns numerator (b) and denominator (a) polynomials, 'zpk' returns zeros, poles, and gain, and 'sos' returns second-order sections.
-        
-        fs: The sampling frequency of the digital system. It's required if analog is False.
+        Design the filter, the data itself is not used.
         """
-        self.b, self.a = butter(N = self.order, 
-                      Wn = self.Wn, 
-                      btype=self.filter_type, 
-                      analog=False, 
-                      output=self.output, 
-                      fs=None)
-    
-    def transform(self):
+        cutoff = self.cutoff_frequency
+        if isinstance(cutoff, list):
+            cutoff = tuple(cutoff)
+        self.sos_ = butterworth_sos(
+            self.order, cutoff, self.sampling_frequency, self.btype
+        )
+        self.n_features_in_ = np.asarray(X).shape[1]
+        return self
+
+    def transform(self, X):
         """
-            Apply the filter to the signal
+        Apply the filter to the signal
         """
-        filtered_signal = filtfilt(self.b, self.a, self.signal)
-        return filtered_signal
-
-class pca:
-    def __init__(self,
-                 df,
-                 cols,
-                 num_components):
-        self.x = df[cols]
-        self.n = num_components
-    
-    def fit(self):
-        # Standardizing the features
-        self.x = StandardScaler().fit_transform(self.x)
-        
-        # Perform PCA
-        pca = PCA(num_cmponenets=self.n)
-        principle_componenets = pca.fit_transform(self.x)
-        
-        self.pc_df = pd.DataFrame(principle_components,
-                                  columns = [f"pc_{i}" for i in range(self.n)])
-    
\ No newline at end of file
+        return filter_signal(X, self.sos_, self.phase_shift)
+
+
+class RangeNormalizer(BaseEstimator, TransformerMixin):
+    """
+    Subtract the mean and divide by the range (max - min) of every column.
+
+    This is the normalization that is used before the PCA in the feature pipeline. The statistics
+    can also be collected over chunks with partial_fit.
+    """
+
+    def fit(self, X, y=None):
+        for attr in ("n_samples_seen_", "mean_", "min_", "max_"):
+            if hasattr(self, attr):
+                delattr(self, attr)
+        return self.partial_fit(X)
+
+    def partial_fit(self, X, y=None):
+        X = np.asarray(X, dtype=float)
+        count = np.sum(~np.isnan(X), axis=0)
+        total = np.nansum(X, axis=0)
+        if not hasattr(self, "n_samples_seen_"):
+            self.n_features_in_ = X.shape[1]
+            self.n_samples_seen_ = np.zeros(X.shape[1])
+            self.sum_ = np.zeros(X.shape[1])
+            self.min_ = np.full(X.shape[1], np.inf)
+            self.max_ = np.full(X.shape[1], -np.inf)
+        self.n_samples_seen_ = self.n_samples_seen_ + count
+        self.sum_ = self.sum_ + total
+        self.min_ = np.fmin(self.min_, np.nanmin(X, axis=0, initial=np.inf))
+        self.max_ = np.fmax(self.max_, np.nanmax(X, axis=0, initial=-np.inf))
+        self.mean_ = self.sum_ / self.n_samples_seen_
+        self.range_ = self.max_ - self.min_
+        return self
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean_) / self.range_
+
+    def inverse_transform(self, X):
+        return np.asarray(X, dtype=float) * self.range_ + self.mean_
+
+
+def signal_pipeline(
+    order=5,
+    cutoff_frequency=1.3,
+    sampling_frequency=5.0,
+    n_components=3,
+    scaler="range",
+    phase_shift=True,
+):
+    """
+    Low-pass filter, normalize and project the signal on its principal components.
+
+    scaler: 'range' for RangeNormalizer (as used by PrincipalComponentAnalysis) or 'standard'
+    for StandardScaler.
+    """
+    return Pipeline(
+        [
+            (
+                "filter",
+                ButterworthFilter(
+                    order=order,
+                    cutoff_frequency=cutoff_frequency,
+                    sampling_frequency=sampling_frequency,
+                    phase_shift=phase_shift,
+                ),
+            ),
+            ("scaler", RangeNormalizer() if scaler == "range" else StandardScaler()),
+            ("pca", PCA(n_components=n_components)),
+        ]
+    )
@@ -0,0 +1,349 @@
+"""
+    Classify the exercise of raw MetaWear recordings.
+
+    ExercisePredictor applies the fitted preprocessing of the feature build (resampling,
+    imputation, low-pass filter, PCA, magnitude, temporal and frequency features) to raw
+    accelerometer and gyroscope samples and runs the trained model on the result. Only the
+    feature columns the model uses are computed, see features.registry.
+
+    - Batch: predict_files / predict_raw classify whole recordings.
+    - Streaming: StreamingPredictor keeps a rolling buffer of 200 ms rows per device, so
+      every new tick costs O(buffer) work instead of recomputing the whole history.
+
+    python -m src.scripts.models.predict_model --acc <accelerometer.csv> --gyro <gyroscope.csv> --benchmark
+"""
+import argparse
+import time
+from collections import deque
+from os.path import exists
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from ..data.ingestion import EPOCH_COLUMN, read_sensor_file
+from ..data.preprocessing import align_and_resample
+from ..data.schema import SENSOR_COLUMNS
+from ..features.clustering import KMeansClustering
+from ..features.data_transformation import PrincipalComponentAnalysis
+from ..features.pipeline import CLUSTERING_PATH, PCA_PATH
+from ..features.registry import FeatureResolver
+
+MODEL_PATH = Path(__file__).resolve().parents[3] / "models" / "best_model.joblib"
+
+# Per tick latency targets of the streaming path, well within the 200 ms tick.
+LATENCY_TARGETS_MS = {"p50": 50.0, "p99": 100.0}
+
+STEP_MS = 200
+
+
+class ExercisePredictor:
+    """The fitted preprocessing and the trained model.
+
+    Args:
+        model (dict): Model bundle of train_model.fit_best, with "model" and "columns"
+        pca (PrincipalComponentAnalysis, optional): The fitted PCA of the feature build,
+            needed when the model uses pca columns.
+        clustering (KMeansClustering, optional): The fitted clustering of the feature
+            build, needed when the model uses the cluster column.
+        sampling_frequency (float, optional): Defaults to 5 Hz (200 ms rows).
+        cutoff_frequency (float, optional): Low-pass cutoff. Defaults to 1.3.
+        order (int, optional): Low-pass order. Defaults to 5.
+        frequency_window_size (int, optional): Defaults to 14.
+    """
+
+    def __init__(
+        self,
+        model,
+        pca=None,
+        clustering=None,
+        sampling_frequency=1000 / STEP_MS,
+        cutoff_frequency=1.3,
+        order=5,
+        frequency_window_size=14,
+    ):
+        self.model = model["model"]
+        self.columns = list(model["columns"])
+        self.sampling_frequency = sampling_frequency
+        self.cutoff_frequency = cutoff_frequency
+        self.order = order
+        self.frequency_window_size = frequency_window_size
+        self.pca = pca
+        self.clustering = clustering
+        if self.pca is None and self.plan()["pca"]:
+            raise ValueError(
+                "The model uses pca columns, pass the PCA saved by the feature build, see "
+                "pipeline.PCA_PATH"
+            )
+        if self.clustering is None and self.plan()["cluster"]:
+            raise ValueError(
+                "The model uses the cluster column, pass the clustering saved by the "
+                "feature build, see pipeline.CLUSTERING_PATH"
+            )
+
+    @classmethod
+    def load(
+        cls,
+        model_path=MODEL_PATH,
+        pca_path=PCA_PATH,
+        clustering_path=CLUSTERING_PATH,
+        **kwargs,
+    ):
+        # A missing file is only an error when the model uses its columns.
+        pca = (
+            PrincipalComponentAnalysis.load(pca_path)
+            if pca_path and exists(pca_path)
+            else None
+        )
+        clustering = (
+            KMeansClustering.load(clustering_path)
+            if clustering_path and exists(clustering_path)
+            else None
+        )
+        return cls(joblib.load(model_path), pca=pca, clustering=clustering, **kwargs)
+
+    def resolver(self, group_col="ind"):
+        return FeatureResolver(
+            sampling_frequency=self.sampling_frequency,
+            cutoff_frequency=self.cutoff_frequency,
+            order=self.order,
+            frequency_window_size=self.frequency_window_size,
+            pca=self.pca,
+            clustering=self.clustering,
+            group_col=group_col,
+        )
+
+    def plan(self):
+        """The feature columns to compute per stage, see FeatureResolver.plan."""
+        return self.resolver().plan(self.columns, set(SENSOR_COLUMNS))
+
+    def history(self):
+        """Number of 200 ms rows needed before all features of the model are defined."""
+        plan = self.plan()
+        history = [0]
+        for params in plan["temporal"].values():
+            history.append(int(params["ws"]) - 1)
+        for params in plan["frequency"].values():
+            history.append(int(params.get("ws") or self.frequency_window_size))
+        return max(history) + 1
+
+    def features(self, data_table, group_col="ind"):
+        """Compute the feature columns of the model on a resampled dataset."""
+        data_table = data_table.copy()
+        data_table[SENSOR_COLUMNS] = data_table[SENSOR_COLUMNS].interpolate()
+        return self.resolver(group_col).resolve(data_table, self.columns)
+
+    def predict_frame(self, data_table, group_col="ind"):
+        """Predict every row of a resampled dataset that has all features.
+
+        Returns:
+            pd.Series: The predicted exercise per row, NaN without enough history
+        """
+        features = self.features(data_table, group_col)[self.columns]
+        complete = features.notna().all(axis=1).to_numpy()
+        prediction = pd.Series(np.nan, index=data_table.index, dtype=object)
+        if complete.any():
+            prediction[complete] = self.model.predict(
+                features[complete].to_numpy(dtype=np.float32)
+            )
+        return prediction
+
+    def predict_raw(self, df_acc, df_gyro):
+        """Predict the rows of a recording, see ingestion.df_from_files for the frames."""
+        df = align_and_resample(df_acc, df_gyro, step_ms=STEP_MS)
+        df["prediction"] = self.predict_frame(df)
+        return df
+
+    def predict_files(self, acc_file, gyro_file):
+        """Predict a recording from its accelerometer and gyroscope csv file.
+
+        Returns:
+            tuple: The resampled rows with their prediction, and the most frequent
+            prediction of the recording
+        """
+        frames = []
+        for file in (acc_file, gyro_file):
+            df = read_sensor_file(file)
+            df.index = pd.to_datetime(df[EPOCH_COLUMN], unit="ms")
+            del df[EPOCH_COLUMN]
+            df["ind"] = 1
+            frames.append(df)
+        df = self.predict_raw(*frames)
+        predictions = df["prediction"].dropna()
+        label = predictions.mode().iloc[0] if len(predictions) else None
+        return df, label
+
+
+class _DeviceState:
+    def __init__(self, buffer_size):
+        # Open 200 ms buckets per sensor: bucket -> [sum x, sum y, sum z, count]
+        self.open = {"acc": {}, "gyro": {}}
+        self.latest = {"acc": -1, "gyro": -1}
+        self.rows = deque(maxlen=buffer_size)
+        self.index = deque(maxlen=buffer_size)
+
+
+class StreamingPredictor:
+    """Streaming classification per device.
+
+    Raw samples are averaged into 200 ms buckets like align_and_resample. A bucket is closed
+    once both sensors have moved past it, and the resulting row is appended to a rolling
+    buffer of the last buffer_size rows. Every closed bucket is classified on that buffer.
+    The low-pass filter therefore only sees the buffer, which is close to but not exactly
+    the batch result.
+
+    When one sensor stalls, buckets more than max_lag_ms behind the newest sample of the
+    device are closed anyway. Without both sensors they do not make a row and are dropped,
+    so the open buckets of the other sensor do not keep growing.
+
+    Args:
+        predictor (ExercisePredictor): The fitted predictor
+        buffer_size (int, optional): Rows kept per device. Defaults to twice the history
+            of the model with a minimum of 32.
+        max_lag_ms (int, optional): How far one sensor may fall behind the other before
+            its buckets are dropped. Defaults to 2000 ms.
+    """
+
+    def __init__(self, predictor, buffer_size=None, max_lag_ms=2000):
+        self.predictor = predictor
+        self.history = predictor.history()
+        self.buffer_size = buffer_size or max(2 * self.history, 32)
+        self.max_lag = max_lag_ms // STEP_MS
+        self.resolver = predictor.resolver(group_col=None)
+        self.devices = {}
+
+    def _close(self, state, bucket):
+        acc = state.open["acc"].pop(bucket, None)
+        gyro = state.open["gyro"].pop(bucket, None)
+        if acc is None or gyro is None:
+            return False
+        state.rows.append(
+            [acc[0] / acc[3], acc[1] / acc[3], acc[2] / acc[3]]
+            + [gyro[0] / gyro[3], gyro[1] / gyro[3], gyro[2] / gyro[3]]
+        )
+        state.index.append(bucket * STEP_MS)
+        return True
+
+    def add_sample(self, device, sensor, epoch_ms, x, y, z):
+        """Add one raw sample.
+
+        Args:
+            device (hashable): Device id
+            sensor (string): "acc" or "gyro"
+            epoch_ms (int): Time of the sample in milliseconds since epoch
+            x, y, z (float): The sensor values
+
+        Returns:
+            list: (timestamp, prediction) for every 200 ms row this sample closed
+        """
+        state = self.devices.get(device)
+        if state is None:
+            state = self.devices[device] = _DeviceState(self.buffer_size)
+
+        bucket = epoch_ms // STEP_MS
+        values = state.open[sensor].setdefault(bucket, [0.0, 0.0, 0.0, 0])
+        values[0] += x
+        values[1] += y
+        values[2] += z
+        values[3] += 1
+        state.latest[sensor] = max(state.latest[sensor], bucket)
+
+        # Buckets both sensors have moved past will not receive samples anymore, and
+        # buckets too far behind the newest sample are given up on.
+        done = max(
+            min(state.latest["acc"], state.latest["gyro"]),
+            max(state.latest["acc"], state.latest["gyro"]) - self.max_lag,
+        )
+        closed = sorted(
+            b for b in set(state.open["acc"]) | set(state.open["gyro"]) if b < done
+        )
+        predictions = []
+        for b in closed:
+            if self._close(state, b):
+                predictions.append(
+                    (pd.Timestamp(b * STEP_MS, unit="ms"), self._predict(state))
+                )
+        return predictions
+
+    def _predict(self, state):
+        if len(state.rows) < self.history:
+            return None
+        data_table = pd.DataFrame(list(state.rows), columns=SENSOR_COLUMNS)
+        features = self.resolver.resolve(data_table, self.predictor.columns)
+        last = features[self.predictor.columns].iloc[[-1]]
+        if last.isna().any(axis=1).iloc[0]:
+            return None
+        return self.predictor.model.predict(last.to_numpy(dtype=np.float32))[0]
+
+
+def _raw_samples(df, sensor):
+    epoch = df.index.values.astype("datetime64[ms]").astype("int64")
+    values = df.iloc[:, 0:3].to_numpy(dtype=float)
+    return [(e, sensor, v[0], v[1], v[2]) for e, v in zip(epoch, values)]
+
+
+def benchmark_streaming(predictor, df_acc, df_gyro, device="benchmark"):
+    """Replay a recording sample by sample and measure the latency per sample.
+
+    Returns:
+        dict: p50 and p99 latency in ms of the samples that closed a row, the number of
+        rows and whether the LATENCY_TARGETS_MS were met
+    """
+    streaming = StreamingPredictor(predictor)
+    samples = sorted(_raw_samples(df_acc, "acc") + _raw_samples(df_gyro, "gyro"))
+
+    latencies = []
+    for epoch_ms, sensor, x, y, z in samples:
+        start = time.perf_counter()
+        closed = streaming.add_sample(device, sensor, epoch_ms, x, y, z)
+        elapsed = (time.perf_counter() - start) * 1000
+        if closed:
+            latencies.append(elapsed)
+
+    result = {
+        "ticks": len(latencies),
+        "p50": float(np.percentile(latencies, 50)) if latencies else np.nan,
+        "p99": float(np.percentile(latencies, 99)) if latencies else np.nan,
+    }
+    result["targets_met"] = all(
+        result[key] <= target for key, target in LATENCY_TARGETS_MS.items()
+    )
+    return result
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--pca", default=PCA_PATH, help="PCA saved by the feature build")
+    parser.add_argument(
+        "--clustering",
+        default=CLUSTERING_PATH,
+        help="Clustering saved by the feature build",
+    )
+    parser.add_argument("--acc", required=True, help="Accelerometer csv file")
+    parser.add_argument("--gyro", required=True, help="Gyroscope csv file")
+    parser.add_argument("--benchmark", action="store_true")
+    args = parser.parse_args(args)
+
+    predictor = ExercisePredictor.load(args.model, args.pca, args.clustering)
+    df, label = predictor.predict_files(args.acc, args.gyro)
+    print(f"Predicted exercise: {label}")
+
+    if args.benchmark:
+        frames = []
+        for file in (args.acc, args.gyro):
+            raw = read_sensor_file(file)
+            raw.index = pd.to_datetime(raw[EPOCH_COLUMN], unit="ms")
+            frames.append(raw.drop(columns=[EPOCH_COLUMN]))
+        result = benchmark_streaming(predictor, *frames)
+        print(
+            f"Streaming: {result['ticks']} ticks, p50 {result['p50']:.2f} ms, "
+            f"p99 {result['p99']:.2f} ms (targets {LATENCY_TARGETS_MS}, "
+            f"{'met' if result['targets_met'] else 'NOT met'})"
+        )
+    return df, label
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+    Model selection for the exercise classifier.
+
+    Loads the feature table, evaluates every candidate classifier for every combination of
+    its parameter grid on every feature set with participant grouped cross-validation, and
+    stores the best model. Folds run in parallel with joblib. The score of every fold is
+    cached on disk under a hash of the data, the feature set, the model, its parameters, the
+    sklearn version and the fold, so an interrupted or extended sweep only runs the folds it
+    has not seen.
+
+    python -m src.scripts.models.train_model --input ../../data/interim/03_data_features.pkl
+"""
+import argparse
+import hashlib
+import json
+import os
+from os.path import exists, join
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import GroupKFold, ParameterGrid
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from ..data.schema import SENSOR_COLUMNS
+from ..data.storage import load_dataset
+from ..features.pipeline import dataset_key
+
+# Relative to the repository, so the script runs from any working directory.
+ROOT_PATH = Path(__file__).resolve().parents[3]
+FEATURE_DATA_PATH = ROOT_PATH / "src" / "data" / "interim" / "03_data_features.pkl"
+MODEL_PATH = ROOT_PATH / "models" / "best_model.joblib"
+CACHE_DIR = ROOT_PATH / "models" / "cv_cache"
+
+LABEL_COLUMN = "excercise"
+GROUP_COLUMN = "participant"
+RANDOM_STATE = 42
+
+CANDIDATES = {
+    "RF": (
+        RandomForestClassifier(random_state=RANDOM_STATE),
+        {"n_estimators": [50, 100], "min_samples_leaf": [2, 10, 50]},
+    ),
+    "NN": (
+        MLPClassifier(max_iter=1000, random_state=RANDOM_STATE),
+        {"hidden_layer_sizes": [(5,), (10,), (25,), (100,)], "alpha": [0.0001]},
+    ),
+    "KNN": (KNeighborsClassifier(), {"n_neighbors": [1, 2, 5, 10]}),
+    "DT": (
+        DecisionTreeClassifier(random_state=RANDOM_STATE),
+        {"min_samples_leaf": [2, 10, 50, 100, 200], "criterion": ["gini", "entropy"]},
+    ),
+    "NB": (GaussianNB(), {}),
+}
+
+
+def load_features(path):
+    """Load a feature table from a pickle or a columnar dataset directory."""
+    return load_dataset(path)
+
+
+def feature_sets(df):
+    """The feature sets to compare, each one extends the previous one.
+
+    Returns:
+        dict: Feature set name to the list of its columns that exist in df
+    """
+    basic = [col for col in SENSOR_COLUMNS if col in df.columns]
+    square = [col for col in ("acc_sum", "gyro_sum") if col in df.columns]
+    pca = [col for col in df.columns if col.startswith("pca_")]
+    time = [col for col in df.columns if "_temp_" in col]
+    freq = [
+        col
+        for col in df.columns
+        if ("_freq" in col) or col.endswith("_pse") or col == "cluster"
+    ]
+    sets = {
+        "feature_set_1": basic,
+        "feature_set_2": basic + square + pca,
+        "feature_set_3": basic + square + pca + time,
+        "feature_set_4": basic + square + pca + time + freq,
+    }
+    return {name: list(dict.fromkeys(cols)) for name, cols in sets.items()}
+
+
+def fold_key(data_key, feature_set, model, estimator, params, n_splits, fold):
+    # The full parameters of the estimator (not only the grid) and the sklearn version are
+    # hashed, so changing a candidate or upgrading sklearn does not reuse stale scores.
+    estimator = clone(estimator).set_params(**params)
+    description = {
+        "data": data_key,
+        "features": feature_set,
+        "model": model,
+        "estimator": repr(sorted(estimator.get_params().items())),
+        "sklearn": sklearn.__version__,
+        "params": params,
+        "n_splits": n_splits,
+        "fold": fold,
+    }
+    return hashlib.sha256(
+        json.dumps(description, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def evaluate_fold(estimator, params, X, y, train, test, cache_path=None):
+    """Fit a clone of the estimator on one fold and return its test accuracy."""
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train], y[train])
+    score = float(accuracy_score(y[test], model.predict(X[test])))
+    if cache_path is not None:
+        with open(cache_path, "w") as f:
+            json.dump({"accuracy": score}, f)
+    return score
+
+
+def select_model(
+    df,
+    candidates=CANDIDATES,
+    sets=None,
+    n_splits=5,
+    n_jobs=-1,
+    cache_dir=CACHE_DIR,
+):
+    """Cross-validate every candidate, parameter combination and feature set.
+
+    Args:
+        df (pd.DataFrame): The feature table
+        candidates (dict, optional): Model name to (estimator, parameter grid).
+        sets (dict, optional): Feature set name to columns. Defaults to feature_sets(df).
+        n_splits (int, optional): Number of participant grouped folds. Defaults to 5.
+        n_jobs (int, optional): Number of parallel folds. Defaults to -1 (all cores).
+        cache_dir (string, optional): Folder of the fold cache, None disables it.
+
+    Returns:
+        pd.DataFrame: Mean and std accuracy per feature set, model and parameters, best first
+    """
+    sets = feature_sets(df) if sets is None else sets
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    tasks = []
+    for set_name, cols in sets.items():
+        data = df.dropna(subset=cols + [LABEL_COLUMN])
+        X = data[cols].to_numpy(dtype=np.float32)
+        y = data[LABEL_COLUMN].astype(str).to_numpy()
+        groups = data[GROUP_COLUMN].astype(str).to_numpy()
+        key = dataset_key(data[cols + [LABEL_COLUMN, GROUP_COLUMN]])
+        splits = min(n_splits, len(np.unique(groups)))
+        folds = list(GroupKFold(n_splits=splits).split(X, y, groups))
+
+        for model_name, (estimator, grid) in candidates.items():
+            for params in ParameterGrid(grid):
+                for fold, (train, test) in enumerate(folds):
+                    cache_path = None
+                    if cache_dir is not None:
+                        cache_path = join(
+                            cache_dir,
+                            fold_key(
+                                key, cols, model_name, estimator, params, splits, fold
+                            )
+                            + ".json",
+                        )
+                    tasks.append(
+                        {
+                            "feature_set": set_name,
+                            "model": model_name,
+                            "params": params,
+                            "fold": fold,
+                            "estimator": estimator,
+                            "X": X,
+                            "y": y,
+                            "train": train,
+                            "test": test,
+                            "cache_path": cache_path,
+                        }
+                    )
+
+    scores = [None] * len(tasks)
+    pending = []
+    for i, task in enumerate(tasks):
+        cache_path = task["cache_path"]
+        if cache_path is not None and exists(cache_path):
+            with open(cache_path, "r") as f:
+                scores[i] = json.load(f)["accuracy"]
+        else:
+            pending.append(i)
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(
+            tasks[i]["estimator"],
+            tasks[i]["params"],
+            tasks[i]["X"],
+            tasks[i]["y"],
+            tasks[i]["train"],
+            tasks[i]["test"],
+            tasks[i]["cache_path"],
+        )
+        for i in pending
+    )
+    for i, score in zip(pending, results):
+        scores[i] = score
+
+    rows = [
+        {
+            "feature_set": task["feature_set"],
+            "model": task["model"],
+            "params": json.dumps(task["params"], sort_keys=True),
+            "fold": task["fold"],
+            "accuracy": score,
+        }
+        for task, score in zip(tasks, scores)
+    ]
+    summary = (
+        pd.DataFrame(rows)
+        .groupby(["feature_set", "model", "params"], sort=True)["accuracy"]
+        .agg(["mean", "std"])
+        .reset_index()
+    )
+    # Sort on the score and break ties on the names, so the selection is reproducible.
+    return summary.sort_values(
+        ["mean", "feature_set", "model", "params"],
+        ascending=[False, True, True, True],
+        kind="stable",
+    ).reset_index(drop=True)
+
+
+def fit_best(df, summary, candidates=CANDIDATES, sets=None):
+    """Refit the best model of the summary on the full feature table.
+
+    Returns:
+        dict: The fitted model, its feature columns, feature set and parameters
+    """
+    sets = feature_sets(df) if sets is None else sets
+    best = summary.iloc[0]
+    cols = sets[best["feature_set"]]
+    params = json.loads(best["params"])
+    data = df.dropna(subset=cols + [LABEL_COLUMN])
+
+    model = clone(candidates[best["model"]][0]).set_params(**params)
+    model.fit(data[cols].to_numpy(dtype=np.float32), data[LABEL_COLUMN].astype(str))
+    return {
+        "model": model,
+        "columns": cols,
+        "feature_set": best["feature_set"],
+        "model_name": best["model"],
+        "params": params,
+        "accuracy": float(best["mean"]),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input", default=FEATURE_DATA_PATH)
+    parser.add_argument("--output", default=MODEL_PATH)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--models", nargs="+", default=list(CANDIDATES))
+    parser.add_argument("--feature-sets", nargs="+", default=None)
+    parser.add_argument("--n-splits", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args(args)
+
+    df = load_features(args.input)
+    candidates = {name: CANDIDATES[name] for name in args.models}
+    sets = feature_sets(df)
+    if args.feature_sets is not None:
+        sets = {name: sets[name] for name in args.feature_sets}
+
+    summary = select_model(
+        df,
+        candidates=candidates,
+        sets=sets,
+        n_splits=args.n_splits,
+        n_jobs=args.n_jobs,
+        cache_dir=args.cache_dir,
+    )
+    print(summary.head(10).to_string())
+
+    best = fit_best(df, summary, candidates=candidates, sets=sets)
+    joblib.dump(best, args.output)
+    return summary, best
+
+
+if __name__ == "__main__":
+    main()
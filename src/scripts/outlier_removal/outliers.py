@@ -0,0 +1,434 @@
+"""
+    Outlier detection strategies and a batch runner to remove outliers from a dataset.
+
+    Every strategy marks outliers in a set of columns and returns a boolean mask. The batch
+    runner applies one strategy per column within every label (e.g. excercise) and sets the
+    marked values to np.nan. Plotting is optional and matplotlib is only imported when used.
+"""
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+import scipy.special
+from joblib import Parallel, delayed
+from sklearn.neighbors import LocalOutlierFactor
+
+from ..helper_f.instrumentation import instrumented
+
+
+def plot_binary_outliers(dataset, col, outlier_col, reset_index):
+    """Plot outliers in case of a binary outlier score. Here, the col specifies the real data
+    column and outlier_col the columns with a binary value (outlier or not).
+
+    Args:
+        dataset (pd.DataFrame): The dataset
+        col (string): Column that you want to plot
+        outlier_col (string): Outlier column marked with true/false
+        reset_index (bool): whether to reset the index for plotting
+    """
+
+    # Taken from: https://github.com/mhoogen/ML4QS/blob/master/Python3Code/util/VisualizeDataset.py
+    import matplotlib.pyplot as plt
+
+    dataset = dataset.dropna(axis=0, subset=[col, outlier_col])
+    dataset[outlier_col] = dataset[outlier_col].astype("bool")
+
+    if reset_index:
+        dataset = dataset.reset_index()
+
+    fig, ax = plt.subplots()
+
+    plt.xlabel("samples")
+    plt.ylabel("value")
+
+    # Plot non outliers in default color
+    ax.plot(
+        dataset.index[~dataset[outlier_col]],
+        dataset[col][~dataset[outlier_col]],
+        "+",
+    )
+    # Plot data points that are outliers in red
+    ax.plot(
+        dataset.index[dataset[outlier_col]],
+        dataset[col][dataset[outlier_col]],
+        "r+",
+    )
+
+    plt.legend(
+        ["outlier " + col, "no outlier " + col],
+        loc="upper center",
+        ncol=2,
+        fancybox=True,
+        shadow=True,
+    )
+    plt.show()
+
+
+# --------------------------------------------------------------
+# Interquartile range (distribution based)
+# --------------------------------------------------------------
+
+
+@instrumented()
+def mark_outliers_iqr(dataset, col):
+    """Mark values outside of 1.5 times the interquartile range as outliers.
+
+    Args:
+        dataset (pd.DataFrame): The dataset
+        col (string): The column you want apply outlier detection to
+
+    Returns:
+        pd.DataFrame: The original dataframe with an extra boolean column
+        indicating whether the value is an outlier or not.
+    """
+    dataset = dataset.copy()
+    Q1 = np.percentile(dataset[col], 25, method="midpoint")
+    Q3 = np.percentile(dataset[col], 75, method="midpoint")
+    IQR = Q3 - Q1
+    dataset[f"{col}_outlier"] = np.array(
+        (dataset[col] > Q3 + IQR * 1.5) | (dataset[col] < Q1 - IQR * 1.5)
+    )
+    return dataset
+
+
+# --------------------------------------------------------------
+# Chauvenets criteron (distribution based)
+# --------------------------------------------------------------
+
+
+@instrumented()
+def mark_outliers_chauvenet(dataset, col, C=2):
+    """Finds outliers in the specified column of datatable and adds a binary column with
+    the same name extended with '_outlier' that expresses the result per data point.
+
+    Taken from: https://github.com/mhoogen/ML4QS/blob/master/Python3Code/Chapter3/OutlierDetection.py
+
+    Args:
+        dataset (pd.DataFrame): The dataset
+        col (string): The column you want apply outlier detection to
+        C (int, optional): Degree of certainty for the identification of outliers given the assumption
+                           of a normal distribution, typicaly between 1 - 10. Defaults to 2.
+
+    Returns:
+        pd.DataFrame: The original dataframe with an extra boolean column
+        indicating whether the value is an outlier or not.
+    """
+
+    dataset = dataset.copy()
+    # Compute the mean and standard deviation.
+    mean = dataset[col].mean()
+    std = dataset[col].std()
+    N = len(dataset.index)
+    criterion = 1.0 / (C * N)
+
+    # Consider the deviation for the data points.
+    deviation = abs(dataset[col] - mean) / std
+
+    # Express the upper and lower bounds.
+    low = -deviation.to_numpy() / math.sqrt(C)
+    high = deviation.to_numpy() / math.sqrt(C)
+
+    # Determine the probability of observing every point at once
+    prob = 1.0 - 0.5 * (scipy.special.erf(high) - scipy.special.erf(low))
+    # And mark as an outlier when the probability is below our criterion.
+    dataset[col + "_outlier"] = prob < criterion
+    return dataset
+
+
+@instrumented()
+def mark_outliers_chauvenet_grouped(dataset, columns, label="excercise", C=2):
+    """Apply Chauvenet's criterion to every column within every label in one groupby pass.
+
+    The result is the same as calling mark_outliers_chauvenet on every
+    dataset[dataset[label] == value] subset, without copying the dataset per subset.
+
+    Args:
+        dataset (pd.DataFrame): The dataset
+        columns (list): The columns you want apply outlier detection to
+        label (string, optional): Column to group by. Defaults to "excercise".
+        C (int, optional): Degree of certainty, see mark_outliers_chauvenet. Defaults to 2.
+
+    Returns:
+        pd.DataFrame: Boolean mask with one '<col>_outlier' column per column, aligned
+        with the dataset.
+    """
+    grouped = dataset.groupby(label)[columns]
+    mean = grouped.transform("mean")
+    std = grouped.transform("std")
+    N = dataset.groupby(label)[label].transform("size").to_numpy()[:, None]
+    criterion = 1.0 / (C * N)
+
+    deviation = (dataset[columns] - mean).abs().to_numpy() / std.to_numpy()
+    high = deviation / math.sqrt(C)
+    low = -high
+    prob = 1.0 - 0.5 * (scipy.special.erf(high) - scipy.special.erf(low))
+
+    return pd.DataFrame(
+        prob < criterion,
+        index=dataset.index,
+        columns=[col + "_outlier" for col in columns],
+    )
+
+
+# --------------------------------------------------------------
+# Local outlier factor (distance based)
+# --------------------------------------------------------------
+
+
+def _lof_partition(data, n, algorithm, n_jobs, reference_size, random_state):
+    """Fit LOF on one partition and return the predictions and the outlier scores."""
+    if len(data) < 2:
+        return np.ones(len(data), dtype=int), np.full(len(data), -1.0)
+    n = min(n, len(data) - 1)
+
+    if reference_size is not None and len(data) > reference_size:
+        # Novelty mode: fit on a subsample and score the other rows against it. The
+        # reference rows keep the scores of the fit, predicting them again would count
+        # every row as its own neighbor.
+        rng = np.random.default_rng(random_state)
+        reference = rng.choice(len(data), size=reference_size, replace=False)
+        others = np.ones(len(data), dtype=bool)
+        others[reference] = False
+
+        lof = LocalOutlierFactor(
+            n_neighbors=min(n, reference_size - 1),
+            algorithm=algorithm,
+            n_jobs=n_jobs,
+            novelty=True,
+        )
+        lof.fit(data[reference])
+
+        outliers = np.ones(len(data), dtype=int)
+        scores = np.empty(len(data))
+        scores[reference] = lof.negative_outlier_factor_
+        outliers[reference] = np.where(
+            lof.negative_outlier_factor_ < lof.offset_, -1, 1
+        )
+        scores[others] = lof.score_samples(data[others])
+        outliers[others] = lof.predict(data[others])
+        return outliers, scores
+
+    lof = LocalOutlierFactor(n_neighbors=n, algorithm=algorithm, n_jobs=n_jobs)
+    outliers = lof.fit_predict(data)
+    return outliers, lof.negative_outlier_factor_
+
+
+@instrumented()
+def mark_outliers_lof(
+    dataset,
+    columns,
+    n=20,
+    group_col=None,
+    algorithm="auto",
+    n_jobs=None,
+    reference_size=None,
+    random_state=0,
+):
+    """Mark values as outliers using LOF
+
+    On large datasets the neighbor search becomes the bottleneck. Pass group_col to fit LOF
+    per partition (e.g. excercise or ind) in parallel, and reference_size to score every row
+    against a LOF fitted on a random subsample of that size (novelty mode).
+
+    Args:
+        dataset (pd.DataFrame): The dataset
+        columns (list): The columns you want apply outlier detection to
+        n (int, optional): n_neighbors. Defaults to 20.
+        group_col (string, optional): Fit a separate LOF per value of this column.
+            Defaults to None.
+        algorithm (string, optional): "auto", "ball_tree", "kd_tree" or "brute".
+            Defaults to "auto".
+        n_jobs (int, optional): Number of parallel jobs, over the partitions when group_col
+            is given, else for the neighbor search. Defaults to None.
+        reference_size (int, optional): Size of the subsample to fit on. Defaults to None.
+        random_state (int, optional): Seed of the subsample. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: The original dataframe with an extra boolean column
+        indicating whether the value is an outlier or not.
+    """
+
+    dataset = dataset.copy()
+    data = dataset[columns].to_numpy()
+
+    if group_col is None:
+        outliers, X_scores = _lof_partition(
+            data, n, algorithm, n_jobs, reference_size, random_state
+        )
+    else:
+        partitions = list(dataset.groupby(group_col, sort=False).indices.values())
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_lof_partition)(
+                data[rows], n, algorithm, 1, reference_size, random_state
+            )
+            for rows in partitions
+        )
+        outliers = np.ones(len(data), dtype=int)
+        X_scores = np.zeros(len(data))
+        for rows, (partition_outliers, partition_scores) in zip(partitions, results):
+            outliers[rows] = partition_outliers
+            X_scores[rows] = partition_scores
+
+    dataset["outlier_lof"] = outliers == -1
+    return dataset, outliers, X_scores
+
+
+# --------------------------------------------------------------
+# Strategies
+# --------------------------------------------------------------
+
+
+class OutlierStrategy(ABC):
+    """Base class of the outlier strategies.
+
+    A strategy marks the outliers in a set of columns and returns a boolean frame with the
+    same index and columns as dataset[columns].
+    """
+
+    @abstractmethod
+    def mark(self, dataset, columns):
+        pass
+
+    # Mark the outliers within every label separately, strategies can override this when
+    # they have a faster grouped implementation.
+    def mark_grouped(self, dataset, columns, label):
+        mask = np.zeros((len(dataset.index), len(columns)), dtype=bool)
+        for rows in dataset.groupby(label, sort=False).indices.values():
+            mask[rows] = self.mark(dataset.iloc[rows], columns).to_numpy()
+        return pd.DataFrame(mask, index=dataset.index, columns=columns)
+
+
+class IQRStrategy(OutlierStrategy):
+    """Interquartile range, see mark_outliers_iqr."""
+
+    def mark(self, dataset, columns):
+        return pd.DataFrame(
+            {
+                col: mark_outliers_iqr(dataset[[col]], col)[f"{col}_outlier"]
+                for col in columns
+            },
+            index=dataset.index,
+        )
+
+
+class ChauvenetStrategy(OutlierStrategy):
+    """Chauvenet's criterion, see mark_outliers_chauvenet."""
+
+    def __init__(self, C=2):
+        self.C = C
+
+    def mark(self, dataset, columns):
+        return pd.DataFrame(
+            {
+                col: mark_outliers_chauvenet(dataset[[col]], col, C=self.C)[
+                    f"{col}_outlier"
+                ]
+                for col in columns
+            },
+            index=dataset.index,
+        )
+
+    def mark_grouped(self, dataset, columns, label):
+        mask = mark_outliers_chauvenet_grouped(dataset, columns, label=label, C=self.C)
+        mask.columns = columns
+        return mask
+
+
+class LOFStrategy(OutlierStrategy):
+    """Local outlier factor over all columns together, see mark_outliers_lof. A row that is
+    an outlier is marked in every column."""
+
+    def __init__(self, n=20, **kwargs):
+        self.n = n
+        # Extra arguments of mark_outliers_lof, e.g. algorithm, n_jobs or reference_size
+        self.kwargs = kwargs
+
+    def mark(self, dataset, columns):
+        marked = mark_outliers_lof(dataset[columns], columns, n=self.n, **self.kwargs)[0]
+        mask = np.repeat(marked["outlier_lof"].to_numpy()[:, None], len(columns), axis=1)
+        return pd.DataFrame(mask, index=dataset.index, columns=columns)
+
+
+STRATEGIES = {
+    "iqr": IQRStrategy,
+    "chauvenet": ChauvenetStrategy,
+    "lof": LOFStrategy,
+}
+
+
+def get_strategy(strategy):
+    """Return a strategy instance for an instance or one of the names in STRATEGIES."""
+    if isinstance(strategy, OutlierStrategy):
+        return strategy
+    return STRATEGIES[strategy]()
+
+
+# --------------------------------------------------------------
+# Batch runner
+# --------------------------------------------------------------
+
+
+@instrumented()
+def mark_outliers(dataset, columns, strategy="chauvenet", label="excercise"):
+    """Mark the outliers of every column within every label.
+
+    Args:
+        dataset (pd.DataFrame): The dataset
+        columns (list): The columns you want apply outlier detection to
+        strategy (optional): A strategy (or name) for all columns, or a dict with a strategy
+            per column. Defaults to "chauvenet".
+        label (string, optional): Column to group by, None to use the whole dataset.
+            Defaults to "excercise".
+
+    Returns:
+        pd.DataFrame: Boolean mask with the same index and columns as dataset[columns]
+    """
+    if not isinstance(strategy, dict):
+        strategy = {col: strategy for col in columns}
+
+    # Run every strategy once for all of its columns.
+    by_strategy = {}
+    for col in columns:
+        by_strategy.setdefault(strategy[col], []).append(col)
+
+    masks = []
+    for method, cols in by_strategy.items():
+        method = get_strategy(method)
+        if label is None:
+            masks.append(method.mark(dataset, cols))
+        else:
+            masks.append(method.mark_grouped(dataset, cols, label))
+    return pd.concat(masks, axis=1)[columns]
+
+
+@instrumented()
+def remove_outliers(
+    dataset, columns, strategy="chauvenet", label="excercise", plot=False
+):
+    """Set the outliers of every column within every label to np.nan.
+
+    Args:
+        dataset (pd.DataFrame): The dataset
+        columns (list): The columns you want to clean
+        strategy (optional): See mark_outliers. Defaults to "chauvenet".
+        label (string, optional): See mark_outliers. Defaults to "excercise".
+        plot (bool, optional): Plot the marked outliers of every column. Defaults to False.
+
+    Returns:
+        pd.DataFrame: Copy of the dataset in which only the cleaned columns are changed
+    """
+    mask = mark_outliers(dataset, columns, strategy=strategy, label=label)
+
+    if plot:
+        for col in columns:
+            plot_binary_outliers(
+                dataset[[col]].assign(**{f"{col}_outlier": mask[col]}),
+                col,
+                f"{col}_outlier",
+                True,
+            )
+
+    dataset = dataset.copy()
+    dataset[columns] = dataset[columns].mask(mask.to_numpy())
+    return dataset
@@ -0,0 +1,218 @@
+"""
+    Online outlier detection for live sensor feeds.
+
+    The detectors in outliers.py need the whole dataset to compute the mean, the standard
+    deviation or the quartiles. The detectors below keep running statistics instead, so
+    samples can be flagged while a set is being recorded, with O(1) memory per column:
+
+    - StreamingChauvenet: Chauvenet's criterion on a running mean and variance (Welford,
+      merged per chunk with Chan's parallel update).
+    - StreamingIQR: The interquartile range on P-square quantile estimates (Jain and
+      Chlamtac, 1985), which track a quantile with five markers.
+
+    Both emit the same '<col>_outlier' flags as their batch counterparts.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import scipy.special
+
+
+class StreamingChauvenet:
+    """Chauvenet's criterion on running statistics, see outliers.mark_outliers_chauvenet.
+
+    Args:
+        columns (list): The columns you want apply outlier detection to
+        C (int, optional): Degree of certainty for the identification of outliers.
+            Defaults to 2.
+        min_samples (int, optional): Number of samples before anything is flagged.
+            Defaults to 20.
+    """
+
+    def __init__(self, columns, C=2, min_samples=20):
+        self.columns = list(columns)
+        self.C = C
+        self.min_samples = min_samples
+        self.count = np.zeros(len(self.columns))
+        self.mean = np.zeros(len(self.columns))
+        self.M2 = np.zeros(len(self.columns))
+
+    @property
+    def std(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt(self.M2 / (self.count - 1))
+
+    def _merge(self, values):
+        # Chan et al. parallel update of the running mean and sum of squared deviations
+        # with the statistics of a chunk, missing values are ignored.
+        count = np.sum(~np.isnan(values), axis=0)
+        present = count > 0
+        if not present.any():
+            return
+        with np.errstate(invalid="ignore"):
+            mean = np.nanmean(values[:, present], axis=0)
+        M2 = np.nansum((values[:, present] - mean) ** 2, axis=0)
+
+        n_a = self.count[present]
+        n_b = count[present]
+        n = n_a + n_b
+        delta = mean - self.mean[present]
+        self.mean[present] += delta * n_b / n
+        self.M2[present] += M2 + delta**2 * n_a * n_b / n
+        self.count[present] = n
+
+    def update(self, chunk):
+        """Add a chunk of samples to the statistics and flag its outliers.
+
+        Args:
+            chunk (pd.DataFrame): New samples, at least containing the columns
+
+        Returns:
+            pd.DataFrame: One boolean '<col>_outlier' column per column
+        """
+        values = chunk[self.columns].to_numpy(dtype=float)
+        self._merge(values)
+
+        criterion = 1.0 / (self.C * self.count)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deviation = np.abs(values - self.mean) / self.std
+        high = deviation / math.sqrt(self.C)
+        low = -high
+        prob = 1.0 - 0.5 * (scipy.special.erf(high) - scipy.special.erf(low))
+        mask = (prob < criterion) & (self.count >= self.min_samples)
+
+        return pd.DataFrame(
+            mask, index=chunk.index, columns=[col + "_outlier" for col in self.columns]
+        )
+
+    def update_sample(self, sample):
+        """Flag a single sample given as a mapping from column to value."""
+        chunk = pd.DataFrame([{col: sample[col] for col in self.columns}])
+        return {col: bool(flag) for col, flag in self.update(chunk).iloc[0].items()}
+
+
+class P2Quantile:
+    """Estimate a quantile of a stream with the P-square algorithm in constant memory.
+
+    Args:
+        p (float): The quantile, between 0 and 1
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        # Find the cell of x and adjust the extreme markers.
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers towards their desired position.
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    @property
+    def value(self):
+        if not self.heights:
+            return np.nan
+        if len(self.heights) < 5:
+            return float(np.percentile(self.heights, self.p * 100, method="midpoint"))
+        return self.heights[2]
+
+
+class StreamingIQR:
+    """Interquartile range on streaming quartile estimates, see outliers.mark_outliers_iqr.
+
+    Args:
+        columns (list): The columns you want apply outlier detection to
+        factor (float, optional): Values further than factor * IQR from the quartiles are
+            outliers. Defaults to 1.5.
+        min_samples (int, optional): Number of samples before anything is flagged.
+            Defaults to 20.
+    """
+
+    def __init__(self, columns, factor=1.5, min_samples=20):
+        self.columns = list(columns)
+        self.factor = factor
+        self.min_samples = min_samples
+        self.count = {col: 0 for col in self.columns}
+        self.q1 = {col: P2Quantile(0.25) for col in self.columns}
+        self.q3 = {col: P2Quantile(0.75) for col in self.columns}
+
+    def _add(self, col, x):
+        if math.isnan(x):
+            return False
+        self.count[col] += 1
+        self.q1[col].add(x)
+        self.q3[col].add(x)
+        if self.count[col] < self.min_samples:
+            return False
+        Q1 = self.q1[col].value
+        Q3 = self.q3[col].value
+        IQR = Q3 - Q1
+        return x > Q3 + IQR * self.factor or x < Q1 - IQR * self.factor
+
+    def update(self, chunk):
+        """Add a chunk of samples to the quantile estimates and flag its outliers.
+
+        P-square moves its markers after every sample, so this is a Python loop over rows
+        and columns: about 5 us per value, or 30 ms for a 1000 row chunk of six columns.
+        That is plenty for a live feed but slow for a backlog, use outliers.mark_outliers_iqr
+        on recorded data.
+
+        Args:
+            chunk (pd.DataFrame): New samples, at least containing the columns
+
+        Returns:
+            pd.DataFrame: One boolean '<col>_outlier' column per column
+        """
+        values = chunk[self.columns].to_numpy(dtype=float)
+        mask = np.zeros(values.shape, dtype=bool)
+        for i, row in enumerate(values):
+            for j, col in enumerate(self.columns):
+                mask[i, j] = self._add(col, row[j])
+
+        return pd.DataFrame(
+            mask, index=chunk.index, columns=[col + "_outlier" for col in self.columns]
+        )
+
+    def update_sample(self, sample):
+        """Flag a single sample given as a mapping from column to value."""
+        return {
+            col + "_outlier": self._add(col, float(sample[col])) for col in self.columns
+        }
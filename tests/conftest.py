@@ -0,0 +1,28 @@
+import pytest
+
+from src.scripts.benchmarks.synthetic import generate_recordings
+from src.scripts.data.ingestion import df_from_files
+from src.scripts.data.preprocessing import align_and_resample
+from src.scripts.data.schema import SENSOR_COLUMNS
+
+
+@pytest.fixture(scope="session")
+def recordings(tmp_path_factory):
+    """df_gyro, df_acc of 2 participants x 6 synthetic sets of 20 s."""
+    files = generate_recordings(
+        tmp_path_factory.mktemp("raw"), participants=2, sets=6, duration=20.0
+    )
+    return df_from_files(files, n_jobs=1)
+
+
+@pytest.fixture(scope="session")
+def resampled(recordings):
+    df_gyro, df_acc = recordings
+    return align_and_resample(df_acc, df_gyro)
+
+
+@pytest.fixture
+def imputed(resampled):
+    df = resampled.copy()
+    df[SENSOR_COLUMNS] = df[SENSOR_COLUMNS].interpolate()
+    return df
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scripts.features.count_repetitions import (
+    REP_PARAMETERS,
+    StreamingRepCounter,
+    count_repetitions,
+    evaluate_repetitions,
+)
+
+PROCESSED_PATH = (
+    Path(__file__).resolve().parents[1]
+    / "src"
+    / "data"
+    / "processed"
+    / "02_data_outlier_removed.pkl"
+)
+
+# Mean absolute error of the counts per exercise on the labelled sets, as of writing.
+MAX_ERROR = {
+    "batch": {"bench": 1.48, "dead": 3.1, "ohp": 3.0, "row": 0.3, "squat": 1.07},
+    "streaming": {"bench": 1.58, "dead": 0.46, "ohp": 3.1, "row": 0.5, "squat": 1.4},
+}
+
+
+def sinusoid(excercise, reps, period):
+    """A set of reps repetitions of period seconds at 5 Hz, that starts at a minimum and
+    stops half a period after the last repetition."""
+    t = np.arange(0, (reps + 0.5) * period, 0.2)
+    values = 1 - 0.3 * np.cos(2 * np.pi * t / period)
+    return pd.DataFrame(
+        {
+            REP_PARAMETERS[excercise]["column"]: values,
+            "excercise": excercise,
+            "intensity": "medium",
+            "ind": 1,
+        }
+    )
+
+
+@pytest.mark.parametrize("excercise", list(REP_PARAMETERS))
+def test_streaming_count_matches_batch_on_sinusoid(excercise):
+    period = 2.0 if excercise == "row" else 4.0
+    df = sinusoid(excercise, 10, period)
+    assert count_repetitions(df)["repetitions"].iloc[0] == 10
+
+    counter = StreamingRepCounter(excercise)
+    found = []
+    for start in range(0, len(df.index), 7):
+        found += counter.update(df.iloc[start : start + 7])
+    assert counter.repetitions == 10
+    # One repetition per period, delayed by the causal filter.
+    assert (np.abs(np.diff(found) - period * 5) <= 1).all()
+
+    counter.reset()
+    assert counter.update(df) == found
+
+
+@pytest.fixture(scope="module")
+def labelled_sets():
+    if not PROCESSED_PATH.exists():
+        pytest.skip("the processed dataset is not available")
+    df = pd.read_pickle(PROCESSED_PATH)
+    return df[df["excercise"] != "rest"]
+
+
+def test_batch_error_does_not_regress(labelled_sets):
+    error = evaluate_repetitions(count_repetitions(labelled_sets))
+    for excercise, max_error in MAX_ERROR["batch"].items():
+        assert error[excercise] <= max_error + 1e-9, excercise
+
+
+def test_streaming_error_does_not_regress(labelled_sets):
+    rows = []
+    for _, rows_of_set in labelled_sets.groupby("ind"):
+        counter = StreamingRepCounter(str(rows_of_set["excercise"].iloc[0]))
+        counter.update(rows_of_set)
+        rows.append(
+            {
+                "excercise": rows_of_set["excercise"].iloc[0],
+                "intensity": rows_of_set["intensity"].iloc[0],
+                "repetitions": counter.repetitions,
+            }
+        )
+    error = evaluate_repetitions(pd.DataFrame(rows))
+    for excercise, max_error in MAX_ERROR["streaming"].items():
+        assert error[excercise] <= max_error + 1e-9, excercise
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from sklearn.decomposition import PCA
+
+from src.scripts.data.schema import SENSOR_COLUMNS
+from src.scripts.features.data_transformation import PrincipalComponentAnalysis
+
+PCA_COLUMNS = ["pca_1", "pca_2", "pca_3"]
+
+
+@pytest.fixture
+def sensors(imputed):
+    df = imputed.dropna(subset=SENSOR_COLUMNS)
+    return df.astype({col: float for col in SENSOR_COLUMNS})
+
+
+def test_apply_pca_matches_normalize_and_pca(sensors):
+    pca = PrincipalComponentAnalysis()
+    normalized = pca.normalize_dataset(sensors, SENSOR_COLUMNS)
+    expected = PCA(n_components=3).fit_transform(normalized[SENSOR_COLUMNS])
+
+    result = pca.apply_pca(sensors.copy(), SENSOR_COLUMNS, 3)
+    assert (result[PCA_COLUMNS].dtypes == "float64").all()
+    np.testing.assert_allclose(result[PCA_COLUMNS].to_numpy(), expected, atol=1e-9)
+
+
+def test_explained_variance_matches_normalize_and_pca(sensors):
+    pca = PrincipalComponentAnalysis()
+    normalized = pca.normalize_dataset(sensors, SENSOR_COLUMNS)
+    expected = PCA(n_components=len(SENSOR_COLUMNS)).fit(normalized)
+
+    result = pca.determine_pc_explained_variance(sensors, SENSOR_COLUMNS)
+    np.testing.assert_allclose(result, expected.explained_variance_ratio_)
+
+
+def test_fit_chunks_carries_short_chunks_over(sensors):
+    # Chunks of 2 rows are all shorter than the 3 components.
+    pca = PrincipalComponentAnalysis().fit(sensors, SENSOR_COLUMNS, 3, chunk_size=2)
+    assert pca.pca.n_samples_seen_ == len(sensors.index)
+
+    full = PrincipalComponentAnalysis().fit(sensors, SENSOR_COLUMNS, 3)
+    np.testing.assert_allclose(
+        np.abs(pca.transform(sensors.copy())[PCA_COLUMNS].to_numpy()),
+        np.abs(full.transform(sensors.copy())[PCA_COLUMNS].to_numpy()),
+        atol=1e-2,
+    )
+
+
+def test_fit_chunks_needs_enough_rows(sensors):
+    with pytest.raises(ValueError):
+        PrincipalComponentAnalysis().fit(
+            sensors.iloc[:2], SENSOR_COLUMNS, 3, chunk_size=1
+        )
@@ -0,0 +1,21 @@
+import numpy as np
+
+from src.scripts.features.FrequencyAbstraction import FourierTransformation
+
+
+def test_batched_fft_matches_per_row(imputed):
+    cols = ["acc_y", "gyro_x"]
+    df = imputed.iloc[:150].reset_index(drop=True).astype({col: float for col in cols})
+    transformation = FourierTransformation()
+    result = transformation.abstract_frequency(df.copy(), cols, 14, 5)
+    expected = transformation.abstract_frequency(df.copy(), cols, 14, 5, batched=False)
+
+    new = [col for col in expected.columns if col not in df.columns]
+    assert len(new) == 2 * 11
+    for col in new:
+        np.testing.assert_allclose(
+            result[col].to_numpy(dtype=float),
+            expected[col].to_numpy(dtype=float),
+            atol=1e-9,
+            err_msg=col,
+        )
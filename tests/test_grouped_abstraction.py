@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scripts.features.grouped_abstraction import abstract_per_set
+
+
+def sets_frame():
+    # Three sets with a constant value each, a window that spans two sets is not constant.
+    ind = np.repeat([1, 2, 3], [20, 15, 25])
+    return pd.DataFrame({"value": ind * 10.0, "ind": ind})
+
+
+def test_windows_stay_within_a_set():
+    df = abstract_per_set(
+        sets_frame(),
+        temporal_cols=["value"],
+        window_sizes=[5],
+        aggregation_functions=["mean", "std"],
+        frequency_cols=["value"],
+        frequency_window_size=4,
+        sampling_rate=5,
+        n_jobs=1,
+    )
+
+    for _, rows in df.groupby("ind"):
+        mean = rows["value_temp_mean_ws_5"]
+        # The first rows of every set have no complete window.
+        assert mean.iloc[:4].isna().all()
+        np.testing.assert_allclose(mean.iloc[4:], rows["value"].iloc[4:])
+        np.testing.assert_allclose(rows["value_temp_std_ws_5"].iloc[4:], 0, atol=1e-6)
+        assert rows["value_freq_0.0_Hz_ws_4"].iloc[:4].isna().all()
+
+
+def test_rows_keep_their_order():
+    df = sets_frame().sample(frac=1, random_state=0)
+    result = abstract_per_set(
+        df.copy(),
+        temporal_cols=["value"],
+        window_sizes=[3],
+        aggregation_functions=["mean"],
+        n_jobs=1,
+    )
+    pd.testing.assert_index_equal(result.index, df.index)
+
+
+def test_missing_set_raises():
+    df = sets_frame().astype({"ind": float})
+    df.loc[3, "ind"] = np.nan
+    with pytest.raises(ValueError):
+        abstract_per_set(df, temporal_cols=["value"], window_sizes=[3], n_jobs=1)
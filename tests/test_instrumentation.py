@@ -0,0 +1,87 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.scripts.helper_f import instrumentation
+from src.scripts.helper_f.instrumentation import instrumented
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+@instrumented("inner")
+def inner(df):
+    return df.assign(b=1)
+
+
+@instrumented("outer")
+def outer(df):
+    return inner(df).assign(c=2)
+
+
+def test_disabled_calls_are_not_recorded():
+    instrumentation.reset()
+    outer(pd.DataFrame({"a": range(3)}))
+    assert not instrumentation.records
+    assert not instrumentation.totals
+
+
+def test_records_are_bounded_and_totals_cover_all_calls(enabled):
+    df = pd.DataFrame({"a": range(4)})
+    calls = instrumentation.MAX_RECORDS + 5
+    for _ in range(calls):
+        inner(df)
+
+    assert len(instrumentation.records) == instrumentation.MAX_RECORDS
+    totals = instrumentation.summary().loc["inner"]
+    assert totals["calls"] == calls
+    assert totals["rows"] == 4 * calls
+    assert totals["output_columns"] == 2
+
+
+def test_nested_stages_record_their_parent(enabled):
+    outer(pd.DataFrame({"a": range(3)}))
+
+    records = {record["stage"]: record for record in instrumentation.records}
+    assert records["inner"]["parent"] == "outer"
+    assert records["outer"]["parent"] is None
+    # Times are inclusive of the nested stages.
+    assert records["outer"]["seconds"] >= records["inner"]["seconds"]
+
+
+def test_export_jsonl(enabled, tmp_path):
+    outer(pd.DataFrame({"a": range(3)}))
+    path = tmp_path / "stages.jsonl"
+    instrumentation.export_jsonl(path)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["stage"] for line in lines] == ["inner", "outer"]
+    assert lines[1]["rows"] == 3
+    assert lines[1]["output_columns"] == 3
+
+
+def test_export_prometheus(enabled, tmp_path):
+    df = pd.DataFrame({"a": range(3)})
+    outer(df)
+    outer(df)
+    path = tmp_path / "stages.prom"
+    instrumentation.export_prometheus(path)
+
+    lines = path.read_text().splitlines()
+    assert "# TYPE fitness_tracker_stage_calls_total counter" in lines
+    assert "# TYPE fitness_tracker_stage_rows_per_second gauge" in lines
+    assert 'fitness_tracker_stage_calls_total{stage="outer"} 2' in lines
+    assert 'fitness_tracker_stage_rows_total{stage="inner"} 6' in lines
+    samples = [line for line in lines if not line.startswith("#")]
+    for line in samples:
+        name, value = line.rsplit(" ", 1)
+        assert name.startswith("fitness_tracker_stage_")
+        float(value)
+    assert not (tmp_path / "stages.prom.tmp").exists()
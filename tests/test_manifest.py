@@ -0,0 +1,76 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from src.scripts.benchmarks.synthetic import generate_recordings
+from src.scripts.data import manifest
+from src.scripts.data.manifest import recording_key, update_interim
+
+
+@pytest.fixture
+def raw(tmp_path):
+    files = generate_recordings(tmp_path / "raw", participants=1, sets=3, duration=10.0)
+    return tmp_path, sorted(files)
+
+
+def update(tmp_path):
+    return update_interim(
+        tmp_path / "raw",
+        interim_path=tmp_path / "interim.pkl",
+        manifest_path=tmp_path / "manifest.json",
+        n_jobs=1,
+    )
+
+
+def entries(tmp_path):
+    with open(tmp_path / "manifest.json") as f:
+        return json.load(f)["files"]
+
+
+def test_rerun_without_changes_processes_nothing(raw, monkeypatch):
+    tmp_path, files = raw
+    df = update(tmp_path)
+    assert sorted(df["ind"].unique()) == [1, 2, 3]
+
+    # A new mtime with the same content is hashed once and then remembered.
+    os.utime(files[0], (1, 1))
+    monkeypatch.setattr(manifest, "process_recordings", None)
+    pd.testing.assert_frame_equal(update(tmp_path), df)
+    assert entries(tmp_path)[os.path.basename(files[0])]["mtime"] == 1
+
+
+def test_modified_file_only_replaces_its_recording(raw):
+    tmp_path, files = raw
+    df = update(tmp_path)
+    changed = files[0]
+    ind = entries(tmp_path)[os.path.basename(changed)]["ind"]
+
+    content = pd.read_csv(changed)
+    content.iloc[:, 3] += 1.0
+    content.to_csv(changed, index=False, float_format="%.3f")
+    updated = update(tmp_path)
+
+    assert sorted(updated["ind"].unique()) == [1, 2, 3]
+    pd.testing.assert_frame_equal(updated[updated["ind"] != ind], df[df["ind"] != ind])
+    assert not updated[updated["ind"] == ind].equals(df[df["ind"] == ind])
+
+
+def test_deleted_file_drops_its_recording(raw):
+    tmp_path, files = raw
+    df = update(tmp_path)
+    deleted = files[0]
+    ind = entries(tmp_path)[os.path.basename(deleted)]["ind"]
+
+    os.remove(deleted)
+    updated = update(tmp_path)
+
+    assert ind not in set(updated["ind"])
+    pd.testing.assert_frame_equal(updated, df[df["ind"] != ind])
+    # The other file of the recording leaves the manifest as well.
+    assert recording_key(deleted) not in {
+        entry["recording"] for entry in entries(tmp_path).values()
+    }
+    # It is not added again while its partner is missing.
+    pd.testing.assert_frame_equal(update(tmp_path), updated)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import LocalOutlierFactor
+
+from src.scripts.data.schema import SENSOR_COLUMNS
+from src.scripts.outlier_removal.outliers import (
+    mark_outliers_chauvenet,
+    mark_outliers_chauvenet_grouped,
+    mark_outliers_lof,
+)
+
+
+def test_chauvenet_grouped_matches_loop(imputed):
+    # Make sure there are outliers to find.
+    spikes = imputed.index[::97]
+    imputed.loc[spikes, SENSOR_COLUMNS] += 10 * imputed[SENSOR_COLUMNS].std()
+    result = mark_outliers_chauvenet_grouped(imputed, SENSOR_COLUMNS)
+
+    for col in SENSOR_COLUMNS:
+        expected = pd.concat(
+            [
+                mark_outliers_chauvenet(imputed[imputed["excercise"] == label], col)
+                for label in imputed["excercise"].unique()
+            ]
+        )[col + "_outlier"].reindex(imputed.index)
+        assert expected.any()
+        pd.testing.assert_series_equal(result[col + "_outlier"], expected)
+
+
+def test_lof_novelty_reference_rows_match_plain_fit(imputed):
+    data = imputed[SENSOR_COLUMNS].to_numpy()
+    _, outliers, scores = mark_outliers_lof(
+        imputed, SENSOR_COLUMNS, n=20, reference_size=500, random_state=3
+    )
+
+    reference = np.random.default_rng(3).choice(len(data), size=500, replace=False)
+    lof = LocalOutlierFactor(n_neighbors=20)
+    expected = lof.fit_predict(data[reference])
+    np.testing.assert_array_equal(outliers[reference], expected)
+    np.testing.assert_allclose(scores[reference], lof.negative_outlier_factor_)
+
+
+def test_lof_partitioned_matches_per_partition_fit(imputed):
+    dataset, outliers, scores = mark_outliers_lof(
+        imputed, SENSOR_COLUMNS, n=20, group_col="excercise", n_jobs=2
+    )
+
+    for _, part in imputed.groupby("excercise"):
+        rows = imputed.index.get_indexer(part.index)
+        lof = LocalOutlierFactor(n_neighbors=min(20, len(part) - 1))
+        expected = lof.fit_predict(part[SENSOR_COLUMNS].to_numpy())
+        np.testing.assert_array_equal(outliers[rows], expected)
+        np.testing.assert_allclose(scores[rows], lof.negative_outlier_factor_)
+    assert dataset["outlier_lof"].sum() == (outliers == -1).sum()
@@ -0,0 +1,54 @@
+import pandas as pd
+
+from src.scripts.features.clustering import KMeansClustering
+from src.scripts.features.data_transformation import PrincipalComponentAnalysis
+from src.scripts.features.pipeline import build_feature_pipeline
+
+
+def test_cached_run_matches_fresh_run(imputed, tmp_path):
+    # Rows out of time order, the cache has to keep the order of the output.
+    df = imputed.sample(frac=1, random_state=0).sort_values("ind", kind="stable")
+    pipeline = build_feature_pipeline(
+        pca_path=None, n_jobs=1, cache_dir=tmp_path / "cache"
+    )
+    fresh = pipeline.run(df.copy())
+    cached = pipeline.run(df.copy())
+
+    assert pipeline.computed == []
+    pd.testing.assert_frame_equal(cached, fresh)
+
+
+def test_n_jobs_is_not_part_of_the_key(imputed, tmp_path):
+    build_feature_pipeline(pca_path=None, n_jobs=1, cache_dir=tmp_path).run(
+        imputed.copy()
+    )
+    pipeline = build_feature_pipeline(pca_path=None, n_jobs=2, cache_dir=tmp_path)
+    pipeline.run(imputed.copy())
+
+    assert pipeline.computed == []
+
+
+def test_cached_artifacts_belong_to_the_run(imputed, tmp_path):
+    pca_path = tmp_path / "pca.joblib"
+    clustering_path = tmp_path / "clustering.joblib"
+
+    def run(number_comp, cluster_k):
+        pipeline = build_feature_pipeline(
+            number_comp=number_comp,
+            pca_path=pca_path,
+            cluster_k=cluster_k,
+            clustering_path=clustering_path,
+            n_jobs=1,
+            cache_dir=tmp_path / "cache",
+        )
+        pipeline.run(imputed.copy())
+        return pipeline
+
+    run(3, 3)
+    run(2, 4)
+    pipeline = run(3, 3)
+
+    # Everything comes from the cache, but the files are those of the first run again.
+    assert pipeline.computed == []
+    assert PrincipalComponentAnalysis.load(pca_path).pca.n_components_ == 3
+    assert len(KMeansClustering.load(clustering_path).centroids) == 3
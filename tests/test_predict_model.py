@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from src.scripts.data.preprocessing import align_and_resample
+from src.scripts.data.schema import SENSOR_COLUMNS
+from src.scripts.features.registry import FeatureResolver
+from src.scripts.models.predict_model import (
+    STEP_MS,
+    ExercisePredictor,
+    StreamingPredictor,
+    _raw_samples,
+)
+
+COLUMNS = SENSOR_COLUMNS + ["acc_sum", "acc_y_temp_mean_ws_5", "gyro_x_temp_std_ws_5"]
+
+
+@pytest.fixture(scope="module")
+def predictor(resampled):
+    untrained = ExercisePredictor({"model": None, "columns": COLUMNS})
+    features = untrained.features(resampled).dropna(subset=COLUMNS)
+    model = DecisionTreeClassifier(max_depth=4, random_state=0).fit(
+        features[COLUMNS].to_numpy(dtype=np.float32),
+        features["excercise"].astype(str),
+    )
+    return ExercisePredictor({"model": model, "columns": COLUMNS})
+
+
+@pytest.fixture
+def recording(recordings):
+    # The first set only, the streaming predictor sees one continuous recording.
+    df_gyro, df_acc = recordings
+    ind = df_acc["ind"].iloc[0]
+    return df_acc[df_acc["ind"] == ind], df_gyro[df_gyro["ind"] == ind]
+
+
+def replay(streaming, df_acc, df_gyro):
+    samples = sorted(_raw_samples(df_acc, "acc") + _raw_samples(df_gyro, "gyro"))
+    closed = []
+    for epoch_ms, sensor, x, y, z in samples:
+        closed += streaming.add_sample("device", sensor, epoch_ms, x, y, z)
+    return closed
+
+
+def test_buckets_match_align_and_resample(predictor, recording):
+    streaming = StreamingPredictor(predictor, buffer_size=10_000)
+    closed = replay(streaming, *recording)
+
+    expected = align_and_resample(*recording, step_ms=STEP_MS, float_dtype=None)
+    # The last bucket stays open until a sample of the next one arrives.
+    expected = expected.iloc[:-1]
+    state = streaming.devices["device"]
+    assert [timestamp for timestamp, _ in closed] == list(expected.index)
+    assert list(pd.to_datetime(list(state.index), unit="ms")) == list(expected.index)
+    np.testing.assert_allclose(
+        np.array(state.rows), expected[SENSOR_COLUMNS].to_numpy(), atol=1e-6
+    )
+
+
+def test_predictions_match_batch(predictor, recording):
+    closed = replay(StreamingPredictor(predictor), *recording)
+
+    expected = predictor.predict_raw(*recording)["prediction"]
+    streamed = pd.Series(dict(closed), dtype=object)
+    expected = expected.iloc[:-1]
+    assert list(streamed.index) == list(expected.index)
+    assert (streamed.isna() == expected.isna()).all()
+    assert (streamed.dropna() == expected.dropna()).all()
+
+
+def test_stalled_sensor_does_not_keep_buckets(predictor, recording):
+    df_acc, df_gyro = recording
+    streaming = StreamingPredictor(predictor, max_lag_ms=1000)
+    # The gyroscope stops halfway, the accelerometer keeps going.
+    stall = df_gyro.index[len(df_gyro.index) // 2]
+    closed = replay(streaming, df_acc, df_gyro[df_gyro.index < stall])
+
+    state = streaming.devices["device"]
+    assert len(state.open["acc"]) <= 1000 // STEP_MS + 1
+    assert not state.open["gyro"]
+    assert closed[-1][0] < stall
+
+
+def test_resolver_needs_the_fitted_pca(imputed):
+    with pytest.raises(ValueError):
+        FeatureResolver().resolve(imputed.copy(), ["pca_1"])
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from src.scripts.data.preprocessing import align_and_resample, merge_sensors, resampling
+from src.scripts.data.schema import SENSOR_COLUMNS
+
+
+def test_align_and_resample_matches_resampling(recordings):
+    df_gyro, df_acc = recordings
+    expected = resampling(merge_sensors(df_acc, df_gyro))
+    result = align_and_resample(df_acc, df_gyro, float_dtype=None)
+
+    pd.testing.assert_index_equal(result.index, expected.index, check_names=False)
+    np.testing.assert_allclose(
+        result[SENSOR_COLUMNS].to_numpy(dtype=float),
+        expected[SENSOR_COLUMNS].to_numpy(dtype=float),
+        atol=1e-6,
+    )
+    for col in ["participant", "excercise", "intensity", "ind"]:
+        np.testing.assert_array_equal(
+            result[col].astype(str).to_numpy(), expected[col].astype(str).to_numpy()
+        )
@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.scripts.features.clustering import KMeansClustering
+from src.scripts.features.data_transformation import PrincipalComponentAnalysis
+from src.scripts.features.pipeline import build_feature_pipeline
+from src.scripts.features.registry import FeatureResolver
+
+
+def test_resolver_matches_pipeline(imputed, tmp_path):
+    pipeline = build_feature_pipeline(
+        pca_path=tmp_path / "pca.joblib",
+        cluster_k=3,
+        clustering_path=tmp_path / "clustering.joblib",
+        n_jobs=1,
+    )
+    expected = pipeline.run(imputed.copy())
+
+    columns = [
+        "acc_y_lowpass",
+        "pca_2",
+        "cluster",
+        "acc_sum_temp_mean_ws_5",
+        "gyro_x_temp_std_ws_5",
+        "acc_y_freq_0.714_Hz_ws_14",
+        "gyro_sum_pse",
+    ]
+    resolver = FeatureResolver(
+        pca=PrincipalComponentAnalysis.load(tmp_path / "pca.joblib"),
+        clustering=KMeansClustering.load(tmp_path / "clustering.joblib"),
+    )
+    result = resolver.resolve(imputed.copy(), columns)
+
+    for col in columns:
+        assert result[col].dtype == expected[col].dtype, col
+        np.testing.assert_allclose(
+            result[col].to_numpy(dtype=float),
+            expected[col].to_numpy(dtype=float),
+            rtol=1e-5,
+            atol=1e-5,
+            err_msg=col,
+        )
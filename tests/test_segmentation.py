@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from src.scripts.data.schema import SENSOR_COLUMNS
+from src.scripts.data.segmentation import _merge_short_runs, segment, segment_table
+
+
+def stream(parts, start="2019-01-11 10:00"):
+    """200 ms rows of alternating rest (False) and set (True) parts of the given rows."""
+    rng = np.random.default_rng(0)
+    frames = []
+    for active, rows in parts:
+        t = np.arange(rows) * 0.2
+        values = 0.005 * rng.standard_normal((rows, 6))
+        values[:, 2] += 1  # gravity
+        if active:
+            values[:, 2] += 0.5 * np.sin(2 * np.pi * t / 3)
+            values[:, 3] += 20 * np.sin(2 * np.pi * t / 3)
+        frames.append(values)
+    index = pd.date_range(start, periods=sum(rows for _, rows in parts), freq="200ms")
+    return pd.DataFrame(np.concatenate(frames), index=index, columns=SENSOR_COLUMNS)
+
+
+def test_segment_finds_the_sets():
+    df = stream([(False, 100), (True, 150), (False, 100), (True, 200), (False, 100)])
+    result = segment(df)
+    table = segment_table(result)
+
+    assert list(table["active"]) == [False, True, False, True, False]
+    # The energy window blurs the edges of a set by about half a window.
+    np.testing.assert_allclose(table["rows"], [100, 150, 100, 200, 100], atol=10)
+    assert result["ind"].is_monotonic_increasing
+
+
+def test_short_rest_between_sets_joins_them():
+    df = stream([(False, 100), (True, 150), (False, 15), (True, 150), (False, 100)])
+    table = segment_table(segment(df))
+
+    assert list(table["active"]) == [False, True, False]
+    assert abs(table["rows"].iloc[1] - 315) <= 10
+
+
+def test_gap_ends_a_segment():
+    first = stream([(False, 100), (True, 150)])
+    after_gap = first.index[-1] + pd.Timedelta("5s")
+    second = stream([(True, 150), (False, 100)], start=after_gap)
+    table = segment_table(segment(pd.concat([first, second])))
+
+    assert list(table["active"]) == [False, True, True, False]
+
+
+def test_short_edge_runs_merge_into_their_neighbour():
+    active = np.array(
+        [False] * 3 + [True] * 60 + [False] * 40 + [True] * 60 + [False] * 5
+    )
+    starts = np.zeros(len(active), dtype=bool)
+    starts[0] = True
+
+    result = _merge_short_runs(active, starts, False, 25)
+    expected = active.copy()
+    expected[:3] = True
+    expected[-5:] = True
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_short_edge_runs_stay_within_their_block():
+    # Two blocks, the short rest at the end of the first block and the short set at the
+    # start of the second one only have a neighbour in their own block.
+    active = np.array([True] * 60 + [False] * 5 + [True] * 10 + [False] * 60)
+    starts = np.zeros(len(active), dtype=bool)
+    starts[[0, 65]] = True
+
+    rests = _merge_short_runs(active, starts, False, 25)
+    np.testing.assert_array_equal(rests[:65], True)
+    np.testing.assert_array_equal(rests[65:], active[65:])
+
+    sets = _merge_short_runs(rests, starts, True, 50)
+    np.testing.assert_array_equal(sets[:65], True)
+    np.testing.assert_array_equal(sets[65:], False)
+
+
+def test_short_rest_that_is_a_whole_block_is_kept():
+    active = np.array([False] * 5 + [True] * 60)
+    starts = np.zeros(len(active), dtype=bool)
+    starts[[0, 5]] = True
+
+    np.testing.assert_array_equal(_merge_short_runs(active, starts, False, 25), active)
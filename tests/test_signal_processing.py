@@ -0,0 +1,76 @@
+import joblib
+import numpy as np
+from scipy.signal import butter, filtfilt, sosfiltfilt
+from sklearn.decomposition import PCA
+
+from src.scripts.data.schema import SENSOR_COLUMNS
+from src.scripts.features.data_transformation import LowPassFilter
+from src.scripts.helper_f.signal_processing import (
+    RangeNormalizer,
+    butterworth_sos,
+    filter_signal,
+    signal_pipeline,
+)
+
+
+def test_filter_signal_matches_sosfiltfilt(imputed):
+    values = imputed[SENSOR_COLUMNS].dropna().to_numpy(dtype=float)
+    sos = butter(5, 1.3 / 2.5, btype="low", output="sos")
+
+    np.testing.assert_allclose(
+        filter_signal(values, sos), sosfiltfilt(sos, values, axis=0)
+    )
+
+
+def test_filter_signal_pads_short_signals():
+    sos = butterworth_sos(5, 1.3, 5.0)
+    assert filter_signal(np.arange(5.0), sos).shape == (5,)
+
+
+def test_butterworth_sos_is_cached():
+    butterworth_sos.cache_clear()
+    first = butterworth_sos(5, 1.3, 5.0)
+    second = butterworth_sos(5, 1.3, 5.0)
+    assert second is first
+    assert butterworth_sos.cache_info().hits == 1
+    assert butterworth_sos.cache_info().misses == 1
+
+
+def test_low_pass_filter_matches_ba_filtfilt(imputed):
+    df = imputed.dropna(subset=["acc_y"]).copy()
+    b, a = butter(5, 1.3 / 2.5, btype="low", output="ba")
+    expected = filtfilt(b, a, df["acc_y"])
+
+    result = LowPassFilter().low_pass_filter(df, "acc_y", 5, 1.3)
+    np.testing.assert_allclose(result["acc_y_lowpass"], expected, atol=1e-9)
+
+
+def test_range_normalizer_partial_fit_matches_fit(imputed):
+    values = imputed[SENSOR_COLUMNS].to_numpy(dtype=float)
+    full = RangeNormalizer().fit(values)
+
+    chunked = RangeNormalizer()
+    for start in range(0, len(values), 250):
+        chunked.partial_fit(values[start : start + 250])
+
+    for attr in ("n_samples_seen_", "mean_", "min_", "max_", "range_"):
+        np.testing.assert_allclose(getattr(chunked, attr), getattr(full, attr))
+    np.testing.assert_allclose(chunked.transform(values), full.transform(values))
+
+
+def test_signal_pipeline_round_trip(imputed, tmp_path):
+    values = imputed[SENSOR_COLUMNS].dropna().to_numpy(dtype=float)
+    pipeline = signal_pipeline(
+        cutoff_frequency=1.3, sampling_frequency=5, n_components=3
+    )
+    components = pipeline.fit_transform(values)
+
+    filtered = filter_signal(values, butterworth_sos(5, 1.3, 5))
+    expected = PCA(n_components=3).fit_transform(
+        RangeNormalizer().fit_transform(filtered)
+    )
+    np.testing.assert_allclose(np.abs(components), np.abs(expected), atol=1e-9)
+
+    joblib.dump(pipeline, tmp_path / "pipeline.joblib")
+    loaded = joblib.load(tmp_path / "pipeline.joblib")
+    np.testing.assert_allclose(loaded.transform(values), components, atol=1e-9)
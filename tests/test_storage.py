@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from src.scripts.data.storage import (
+    load_dataset,
+    read_dataset,
+    save_dataset,
+    write_dataset,
+)
+
+
+@pytest.fixture
+def stored(resampled, tmp_path):
+    path = tmp_path / "dataset"
+    write_dataset(resampled, path)
+    return path
+
+
+def test_round_trip_keeps_dtypes_and_column_order(resampled, stored):
+    df = read_dataset(stored)
+    assert list(df.columns) == list(resampled.columns)
+    pd.testing.assert_frame_equal(df, resampled, check_categorical=False)
+    assert (df.dtypes == resampled.dtypes).all()
+
+
+def test_filters_and_projection(resampled, stored):
+    df = read_dataset(
+        stored,
+        columns=["gyro_x", "participant", "acc_y"],
+        filters=[("participant", "==", "B"), ("excercise", "in", ["ohp", "row"])],
+    )
+    expected = resampled[
+        (resampled["participant"] == "B") & resampled["excercise"].isin(["ohp", "row"])
+    ][["gyro_x", "participant", "acc_y"]]
+
+    assert list(df.columns) == ["gyro_x", "participant", "acc_y"]
+    assert len(df.index) > 0
+    pd.testing.assert_frame_equal(
+        df.astype({"participant": str}), expected.astype({"participant": str})
+    )
+
+
+def test_save_replaces_the_earlier_output(resampled, tmp_path):
+    path = tmp_path / "dataset"
+    save_dataset(resampled, path)
+    subset = resampled[resampled["participant"] == "A"]
+    save_dataset(subset, path)
+    pd.testing.assert_frame_equal(load_dataset(path), subset, check_categorical=False)
+
+
+def test_pickle_paths(resampled, tmp_path):
+    path = tmp_path / "dataset.pkl"
+    save_dataset(resampled, path)
+    pd.testing.assert_frame_equal(load_dataset(path), resampled)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scripts.data.schema import SENSOR_COLUMNS
+from src.scripts.outlier_removal.outliers import mark_outliers_chauvenet
+from src.scripts.outlier_removal.streaming import StreamingChauvenet, StreamingIQR
+
+
+@pytest.fixture
+def sensors(imputed):
+    df = imputed.dropna(subset=SENSOR_COLUMNS)
+    spikes = df.index[::97]
+    df.loc[spikes, SENSOR_COLUMNS] += 10 * df[SENSOR_COLUMNS].std()
+    return df
+
+
+def test_chauvenet_chunk_merge_matches_batch_statistics(sensors):
+    detector = StreamingChauvenet(SENSOR_COLUMNS)
+    for start in range(0, len(sensors), 137):
+        detector.update(sensors.iloc[start : start + 137])
+
+    np.testing.assert_allclose(detector.mean, sensors[SENSOR_COLUMNS].mean())
+    np.testing.assert_allclose(detector.std, sensors[SENSOR_COLUMNS].std())
+
+
+def test_chauvenet_flags_match_batch(sensors):
+    result = StreamingChauvenet(SENSOR_COLUMNS).update(sensors)
+
+    for col in SENSOR_COLUMNS:
+        expected = mark_outliers_chauvenet(sensors, col)[col + "_outlier"]
+        assert expected.any()
+        pd.testing.assert_series_equal(result[col + "_outlier"], expected)
+
+
+def test_iqr_quartiles_track_numpy(sensors):
+    detector = StreamingIQR(SENSOR_COLUMNS)
+    detector.update(sensors)
+
+    for col in SENSOR_COLUMNS:
+        q1, q3 = np.quantile(sensors[col], [0.25, 0.75])
+        tolerance = 0.05 * (q3 - q1)
+        assert abs(detector.q1[col].value - q1) < tolerance
+        assert abs(detector.q3[col].value - q3) < tolerance
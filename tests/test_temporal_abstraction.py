@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from src.scripts.data.schema import SENSOR_COLUMNS
+from src.scripts.features.TemporalAbstraction import NumericalAbstraction
+
+
+@pytest.mark.parametrize("aggregation", ["mean", "max", "min", "median", "std"])
+def test_native_rolling_matches_apply(imputed, aggregation):
+    imputed.iloc[40, 0] = np.nan
+    abstraction = NumericalAbstraction()
+    result = abstraction.abstract_numerical(
+        imputed.copy(), SENSOR_COLUMNS, [5, 10], aggregation
+    )
+    expected = abstraction.abstract_numerical(
+        imputed.copy(), SENSOR_COLUMNS, [5, 10], aggregation, fast=False
+    )
+
+    new = [col for col in expected.columns if col not in imputed.columns]
+    assert len(new) == 2 * len(SENSOR_COLUMNS)
+    for col in new:
+        np.testing.assert_allclose(
+            result[col].to_numpy(dtype=float),
+            expected[col].to_numpy(dtype=float),
+            rtol=1e-6,
+            atol=1e-7,
+            err_msg=col,
+        )
+
+
+def test_rolling_moments_match_pandas(imputed):
+    values = imputed["gyro_x"].astype(float)
+    values.iloc[[3, 100]] = np.nan
+    moments = NumericalAbstraction().rolling_moments(values.to_numpy(), [2, 7])
+
+    for ws, (mean, std) in moments.items():
+        np.testing.assert_allclose(mean, values.rolling(ws).mean(), atol=1e-9)
+        np.testing.assert_allclose(std, values.rolling(ws).std(ddof=0), atol=1e-7)
+
+
+def test_rolling_moments_shorter_than_window():
+    mean, std = NumericalAbstraction().rolling_moments(np.ones(3), [5])[5]
+    assert np.isnan(mean).all() and np.isnan(std).all()
@@ -0,0 +1,50 @@
+import os
+
+import pandas as pd
+from sklearn.tree import DecisionTreeClassifier
+
+from src.scripts.data.schema import SENSOR_COLUMNS
+from src.scripts.models.train_model import select_model
+
+SETS = {"basic": SENSOR_COLUMNS}
+
+
+def candidates(max_depth):
+    return {
+        "DT": (
+            DecisionTreeClassifier(max_depth=max_depth, random_state=0),
+            {"min_samples_leaf": [2, 10]},
+        )
+    }
+
+
+def test_parallel_folds_match_sequential(imputed):
+    sequential = select_model(
+        imputed, candidates(3), sets=SETS, n_jobs=1, cache_dir=None
+    )
+    parallel = select_model(imputed, candidates(3), sets=SETS, n_jobs=2, cache_dir=None)
+
+    pd.testing.assert_frame_equal(parallel, sequential)
+
+
+def test_fold_cache_is_reused(imputed, tmp_path):
+    fresh = select_model(
+        imputed, candidates(3), sets=SETS, n_jobs=2, cache_dir=tmp_path
+    )
+    n_folds = len(os.listdir(tmp_path))
+    assert n_folds == 2 * 2
+
+    cached = select_model(
+        imputed, candidates(3), sets=SETS, n_jobs=2, cache_dir=tmp_path
+    )
+    assert len(os.listdir(tmp_path)) == n_folds
+    pd.testing.assert_frame_equal(cached, fresh)
+
+
+def test_changed_estimator_misses_the_cache(imputed, tmp_path):
+    select_model(imputed, candidates(3), sets=SETS, n_jobs=1, cache_dir=tmp_path)
+    n_folds = len(os.listdir(tmp_path))
+
+    # Same model name and grid, only a parameter outside the grid changed.
+    select_model(imputed, candidates(1), sets=SETS, n_jobs=1, cache_dir=tmp_path)
+    assert len(os.listdir(tmp_path)) == 2 * n_folds
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from src.scripts.features.grouped_abstraction import abstract_per_set
+from src.scripts.features.windowing import window_features
+
+COLUMNS = ["acc_x", "gyro_y"]
+WINDOW_SIZES = [5, 10]
+AGGREGATIONS = ["mean", "max", "min", "median", "std"]
+
+
+@pytest.fixture
+def sets(imputed):
+    # A set that is shorter than the history of the features gets no windows.
+    short = imputed["ind"] == imputed["ind"].iloc[0]
+    drop = imputed.index[short][8:]
+    return imputed.drop(drop).astype({col: float for col in COLUMNS})
+
+
+@pytest.mark.parametrize("stride", [1, 3, None])
+def test_window_features_match_per_window_loop(sets, stride):
+    result = window_features(
+        sets,
+        COLUMNS,
+        WINDOW_SIZES,
+        AGGREGATIONS,
+        COLUMNS,
+        frequency_window_size=14,
+        sampling_rate=5,
+        stride=stride,
+        float_dtype=None,
+    )
+    row_features = abstract_per_set(
+        sets.copy(),
+        temporal_cols=COLUMNS,
+        window_sizes=WINDOW_SIZES,
+        aggregation_functions=AGGREGATIONS,
+        frequency_cols=COLUMNS,
+        frequency_window_size=14,
+        sampling_rate=5,
+        n_jobs=1,
+    )
+
+    # The first window ends on the first row with 14 + 1 values of history.
+    first_end, step = 14, stride or 15
+    positions = []
+    for rows in sets.groupby("ind", sort=False).indices.values():
+        for end in range(first_end, len(rows), step):
+            positions.append(rows[end])
+            for col in COLUMNS:
+                values = sets[col].to_numpy()[rows]
+                for ws in WINDOW_SIZES:
+                    window = values[end - ws + 1 : end + 1]
+                    for aggregation in ["mean", "max", "min", "median"]:
+                        name = f"{col}_temp_{aggregation}_ws_{ws}"
+                        assert result.loc[sets.index[rows[end]], name] == pytest.approx(
+                            getattr(np, aggregation)(window)
+                        )
+
+    assert len(result.index) == len(positions)
+    assert (result.index == sets.index[positions]).all()
+    new = [col for col in result.columns if col not in sets.columns]
+    expected = row_features.iloc[positions]
+    for col in new:
+        np.testing.assert_allclose(
+            result[col].to_numpy(),
+            expected[col].to_numpy(dtype=float),
+            rtol=1e-6,
+            atol=1e-9,
+            err_msg=col,
+        )